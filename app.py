@@ -1,38 +1,62 @@
 
+import os
+import threading
+import time
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import joblib
+import plotly.io as pio
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from mty_trains import bitmap, charts, correlation, density, ingest, models, paging, profiling, reliability, resources, resultcache, search, snapshot, views, warmup
+
+inicio_rerun = time.perf_counter()
 
 # Configuración de página
 st.set_page_config(layout="wide", page_title="Análisis de Fallas en Trenes")
 
 st.title("📊🚉 Análisis de Fallas en Trenes MTY")
 
-# Cargar datos
-@st.cache_data
-def load_data():
-
-    # Se carga el archivo CSV limpio:
-    #pth_file_clean = "./data/00_clean_data.csv"
-    pth_file_clean = "./data/02_data_for_ML.csv"
-    df = pd.read_csv(pth_file_clean, sep=';', encoding='utf-8')
-
-    # Se ajustan los tipos de datos:
-    df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
+# Instrumentación opcional del rerun (MTY_PERFIL=1 o ?perfil=1 en la URL)
+ctx = get_script_run_ctx()
+perfil = profiling.start_rerun(
+    enabled=profiling.enabled_by_env() or st.query_params.get("perfil") == "1",
+    session_id=ctx.session_id if ctx else None
+)
 
-    categorical_cols = ['day_name', 'Veh', 'Linea', 'Sistema', 'Causó_desalojo', 'Supervisor_reviso', 'Cat', 'Fiabilidad_Servicio']
-    for col in categorical_cols:
-        df[col] = df[col].astype('category')
+# Precalentamiento de cachés en segundo plano: lo lanza `python -m mty_trains.warmup`
+# al arrancar el servidor, o la primera sesión con MTY_PRECALENTAR=1
+if os.environ.get("MTY_PRECALENTAR") == "1":
+    warmup.start()
+cache_caliente = warmup.progress.complete
 
-    return df
-
-df_clean = load_data()
+# Cargar datos
+# El almacén (snapshot + cubo + índices) se comparte entre sesiones; lo que se cachea por
+# proceso vive en mty_trains.resources para que el precalentamiento llene las mismas entradas
+with perfil.section("load_data"):
+    almacen = resources.load_data()
+
+# --- Ingesta incremental ---
+# Los archivos nuevos en data/incoming/ se validan, se guardan como deltas y se aplican
+# sólo sobre las filas nuevas (cubo e índice incluidos)
+with perfil.section("ingesta"):
+    for nombre, resultado in ingest.process_incoming(almacen.state.df):
+        if isinstance(resultado, str):
+            st.toast(f"⚠️ {nombre} rechazado: {resultado}")
+    for nombre, filas in almacen.sync(ingest.DELTAS_DIR):
+        st.toast(f"📥 {nombre}: {filas} registros nuevos")
+    resources.refrescar_consultas()
+
+estado = almacen.state
+df_clean, texto = estado.df, estado.text
 
 # --- Filtros interactivos ---
 
 st.sidebar.header("Filtros")
 
+busqueda = st.sidebar.text_input("🔎 Buscar en descripción / corrección", placeholder="p. ej. pantografo, puerta no abre")
+
 anios = st.sidebar.slider("Rango de Año", int(df_clean['year'].min()), int(df_clean['year'].max()), (int(df_clean['year'].min()), int(df_clean['year'].max())))
 lineas = st.sidebar.multiselect("Selecciona Línea(s)", df_clean['Linea'].cat.categories, default=list(df_clean['Linea'].cat.categories))
 categorias = st.sidebar.multiselect("Selecciona Categoría(s)", df_clean['Cat'].cat.categories, default=list(df_clean['Cat'].cat.categories))
@@ -95,20 +119,133 @@ if not anios:
 
 
 # --- Aplicar filtros ---
-df_filtered = df_clean[
-    (df_clean['Linea'].isin(lineas)) &
-    (df_clean['Sistema'].isin(sistemas)) &
-    (df_clean['Cat'].isin(categorias)) &
-    (df_clean['Veh'].isin(vehiculos)) &
-    (df_clean['year'].between(anios[0], anios[1]))
-]
+# Estado de filtros canónico y hashable (selecciones ordenadas): las computaciones compartidas
+# entre vistas y sesiones se cachean por él (la versión del dataset forma parte de la llave:
+# cambia al ingestar un delta).
+# El último elemento es la búsqueda de texto normalizada: "Pantógrafo" y "pantografo" comparten entrada
+consulta = search.parse_query(busqueda)
+filtros = resultcache.canonical_filters(lineas, sistemas, categorias, vehiculos, anios, consulta)
+
+# Agregados y figuras serializadas, compartidos por todas las sesiones del proceso (LRU acotada en MB)
+resultados = resources.cache_resultados()
+
+@profiling.tracked(st.cache_data(max_entries=8, show_spinner="Puntuando incidentes..."))
+def puntuar_lote(contenido, nombre):
+    # Scoring por bloques vectorizados; el CSV resultante queda cacheado por archivo
+    loaded_clf, loaded_regr = resources.load_models()
+    incidentes = models.read_incidents(contenido, nombre)
+    return models.score_to_csv(loaded_clf, loaded_regr, incidentes), len(incidentes)
+
+@profiling.tracked(st.cache_data(max_entries=32))
+def densidad_scatter(_seleccion, version, filtros):
+    # Malla 2-D por línea + recta OLS en forma cerrada para el scatter agregado
+    datos = _seleccion[['Porcentaje_desalojo', 'Retraso_minutos', 'Linea']]
+    celdas = density.bin_points(datos, 'Porcentaje_desalojo', 'Retraso_minutos', 'Linea')
+    rectas = density.line_fits(datos, 'Porcentaje_desalojo', 'Retraso_minutos', 'Linea')
+    return celdas, rectas
+
+@profiling.tracked(st.cache_resource(max_entries=2))
+def indice_orden(_df, version):
+    # Orden global por columna para ordenar selecciones sin volver a ordenar todo; cada
+    # delta ingestado crea una versión nueva, así que sólo se guardan las dos últimas
+    return paging.SortIndex(_df)
+
+@profiling.tracked(st.cache_resource(max_entries=16))
+def ordenar(_df, version, filtros, columna, ascendente):
+    return indice_orden(_df, version).sort(resources.seleccionar(estado, version, filtros), columna, ascendente)
+
+def mostrar_grafico(nombre, construir, lote=None):
+    # La figura se guarda serializada: con los mismos filtros, otra sesión (o el siguiente
+    # rerun) sólo la deserializa en lugar de volver a agregar y armar el gráfico
+    clave = resultcache.canonical_key(nombre, estado.version, filtros)
+    def tarea():
+        return pio.from_json(resultados.get_or_compute(clave, lambda: construir().to_json(), name='figura'))
+
+    if lote is None:
+        st.plotly_chart(tarea(), use_container_width=True)
+    else:
+        # Se reserva el lugar en la página y la figura se arma en un hilo del lote
+        lote.add(nombre, tarea, st.empty())
+
+def lote_graficos():
+    # Los hilos del pool necesitan el contexto del script para usar las funciones cacheadas
+    return charts.ChartBatch(setup=lambda: add_script_run_ctx(threading.current_thread(), ctx))
+
+def dibujar(lote):
+    # Las figuras se dibujan en el orden en que se registraron, cada una en su lugar
+    for _, lugar, figura in lote.results():
+        lugar.plotly_chart(figura, use_container_width=True)
+
+def agregar_estacionalidad(fig, serie):
+    # Una curva punteada de estacionalidad por línea
+    for linea, datos_linea in serie.groupby('Linea', observed=True):
+        fig.add_scatter(
+            x=datos_linea['Periodo'],
+            y=datos_linea['estacionalidad'],
+            mode='lines',
+            name=f'Estacionalidad L{linea}',
+            line=dict(dash='dash'),
+            legendgroup=f'Estacionalidad L{linea}',
+            showlegend=True
+        )
+
+# Las columnas de la selección se recogen sólo cuando una vista las lee
+with perfil.section("filtros") as seccion:
+    df_filtered = bitmap.Selection(df_clean, resources.seleccionar(estado, estado.version, filtros))
+    seccion['rows'] = len(df_filtered)
+
+if consulta:
+    st.sidebar.caption(f"{len(df_filtered):,} fallas contienen “{busqueda.strip()}”")
+    termino, prefijo = consulta[-1]
+    if prefijo:
+        completados = texto.suggest(termino)
+        if completados:
+            st.sidebar.caption("Términos: " + ", ".join(completados))
 
 # --- Gráficos principales ---
-tab_1, tab_2, tab_3, tab_4, tab_5, tab_6, tab_7 = st.tabs(["𝄜 Dataset","📈 Tendencias", "📊⚠️Distribución Fallas", "🕘Tiempos de retraso", "↩ Desalojos", "🧮 Analíticos", "🤖 Predicciones-ML"])
+# Cada sección es una vista registrada; sólo se ejecuta la vista activa
+vistas = views.ViewRegistry()
 
-with tab_1:
+@vistas.register("𝄜 Dataset")
+def vista_dataset():
     st.subheader("Dataset limpio")
-    st.dataframe(df_filtered, use_container_width=True)
+
+    # Orden, columnas y paginado se resuelven en el servidor; sólo viaja la página visible
+    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+    with col1:
+        columnas_fuente = [col for col in df_clean.columns if col not in snapshot.DERIVED_COLS]
+        columnas = st.multiselect("Columnas", list(df_clean.columns), default=columnas_fuente, key="dataset_columnas")
+    with col2:
+        orden = st.selectbox("Ordenar por", ["(sin orden)"] + list(df_clean.columns), key="dataset_orden")
+        ascendente = st.toggle("Ascendente", value=True, key="dataset_ascendente")
+    with col3:
+        tam_pagina = st.selectbox("Filas por página", paging.PAGE_SIZES, index=1, key="dataset_tam_pagina")
+    with col4:
+        paginas = paging.page_count(len(df_filtered), tam_pagina)
+        pagina = st.number_input("Página", min_value=1, max_value=paginas, value=1, step=1, key="dataset_pagina")
+
+    if not columnas:
+        st.warning("Por favor, selecciona al menos una columna.")
+        return
+
+    if orden == "(sin orden)":
+        posiciones = df_filtered.positions
+    else:
+        posiciones = ordenar(df_clean, estado.version, filtros, orden, ascendente)
+
+    inicio = (pagina - 1) * tam_pagina
+    st.dataframe(paging.page(df_clean, posiciones, pagina, tam_pagina, columnas), use_container_width=True)
+    st.caption(f"Filas {min(inicio + 1, len(posiciones)):,}–{min(inicio + tam_pagina, len(posiciones)):,} de {len(posiciones):,} (página {pagina} de {paginas})")
+
+    # La exportación completa se arma por bloques y sólo cuando se pide
+    if st.button("Preparar descarga del resultado completo", key="dataset_preparar_descarga"):
+        st.download_button(
+            "Descargar CSV",
+            data=b"".join(paging.iter_csv(df_clean, posiciones, columnas)),
+            file_name="fallas_filtradas.csv",
+            mime="text/csv",
+            key="dataset_descarga"
+        )
 
     #st.subheader("Descripción del Dataset")
     #st.write(df_filtered.describe(include='all'))
@@ -118,376 +255,463 @@ with tab_1:
     #st.text(buffer)
 
 
-with tab_2:
+@vistas.register("📈 Tendencias")
+def vista_tendencias():
     # ============== Gráficos de tendencias (semanal) ==============
     st.subheader("Fallas semanales por línea")
 
-    fallas_semana = (
-        df_filtered
-        .assign(week=df_filtered['Fecha'].dt.isocalendar().week, year=df_filtered['Fecha'].dt.isocalendar().year)
-        .groupby(["Linea", "year", "week"], observed=True)
-        .size()
-        .reset_index(name="conteo_fallas")
-    )
-
-    # Calculamos la fecha del primer día de cada semana (lunes)
-    fallas_semana["Periodo"] = pd.to_datetime(
-        fallas_semana["year"].astype(str) + "-W" + fallas_semana["week"].astype(str) + "-1",
-        format="%G-W%V-%u"
-    )
-
-    # Gráfico de líneas por línea
-    fig = px.line(
-        fallas_semana, 
-        x="Periodo", 
-        y="conteo_fallas", 
-        color="Linea", 
-        #title="Fallas semanales por línea",
-        labels={'Periodo': 'Año/Semana', 'conteo_fallas': 'Conteo de Fallas', 'Linea': 'Línea'}
-    )
-
-    # Agregar curva de estacionalidad (media móvil de 12 semanas por línea)
-    for linea in fallas_semana['Linea'].cat.categories:
-        datos_linea = fallas_semana[fallas_semana['Linea'] == linea].sort_values('Periodo')
-        datos_linea['estacionalidad'] = datos_linea['conteo_fallas'].rolling(window=12, min_periods=1).mean()
-        fig.add_scatter(
-            x=datos_linea['Periodo'],
-            y=datos_linea['estacionalidad'],
-            mode='lines',
-            name=f'Estacionalidad L{linea}',
-            line=dict(dash='dash'),
-            legendgroup=f'Estacionalidad L{linea}',
-            showlegend=True
+    def figura():
+        # Conteo por línea y semana (lunes de la semana ISO), con las semanas sin fallas en cero
+        # y la curva de estacionalidad (media móvil de 12 semanas por línea)
+        fallas_semana = resources.tendencia(estado, filtros, "periodo_semana")
+
+        # Gráfico de líneas por línea
+        fig = px.line(
+            fallas_semana, 
+            x="Periodo", 
+            y="conteo_fallas", 
+            color="Linea", 
+            #title="Fallas semanales por línea",
+            labels={'Periodo': 'Año/Semana', 'conteo_fallas': 'Conteo de Fallas', 'Linea': 'Línea'}
         )
+        agregar_estacionalidad(fig, fallas_semana)
+        return fig
 
     # Se muestra el gráfico:
-    st.plotly_chart(fig, use_container_width=True)
+    mostrar_grafico("fallas_semanales", figura)
 
     # ============== Gráficos de tendencias (mensual) ==============
     st.subheader("Fallas mensuales por línea")
     
-    # Agrupamos por año, mes y línea para visualizar tendencias
-    fallas_mes = df_filtered.groupby(["Linea", "year", "month"], observed=True).size().reset_index(name="conteo_fallas")
-    fallas_mes["Periodo"] = pd.to_datetime(fallas_mes[["year", "month"]].assign(day=1)) # <-- Se asigna el día 1 de cada mes para crear una fecha
-
-    # Gráfico de líneas por línea
-    fig = px.line(
-        fallas_mes, 
-        x="Periodo", 
-        y="conteo_fallas", 
-        color="Linea", 
-        #title="Fallas mensuales por línea",
-        labels={'Periodo': 'Año/Mes', 'conteo_fallas': 'Conteo de Fallas', 'Linea': 'Línea'}
-    )
-
-    # Agregar curva de estacionalidad (media móvil de 12 meses por línea)
-    for linea in fallas_mes['Linea'].cat.categories:
-        datos_linea = fallas_mes[fallas_mes['Linea'] == linea].sort_values('Periodo')
-        datos_linea['estacionalidad'] = datos_linea['conteo_fallas'].rolling(window=12, min_periods=1).mean()
-        fig.add_scatter(
-            x=datos_linea['Periodo'],
-            y=datos_linea['estacionalidad'],
-            mode='lines',
-            name=f'Estacionalidad L{linea}',
-            line=dict(dash='dash'),
-            legendgroup=f'Estacionalidad L{linea}',
-            showlegend=True
+    def figura():
+        # Conteo por línea y mes (día 1 de cada mes) + media móvil de 12 meses por línea
+        fallas_mes = resources.tendencia(estado, filtros, "periodo_mes")
+
+        # Gráfico de líneas por línea
+        fig = px.line(
+            fallas_mes, 
+            x="Periodo", 
+            y="conteo_fallas", 
+            color="Linea", 
+            #title="Fallas mensuales por línea",
+            labels={'Periodo': 'Año/Mes', 'conteo_fallas': 'Conteo de Fallas', 'Linea': 'Línea'}
         )
+        agregar_estacionalidad(fig, fallas_mes)
+        return fig
 
-    st.plotly_chart(fig, use_container_width=True)
+    mostrar_grafico("fallas_mensuales", figura)
 
-with tab_3:
+@vistas.register("📊⚠️Distribución Fallas")
+def vista_distribucion():
+    lote = lote_graficos()
 
     # ============== Gráficos de distribución de fallas por semana ==============
     st.subheader("Distribución de fallas por día de la semana")
+    def figura():
+        # Agrupamos por día y línea
+        fallas_dia = df_filtered[["Linea", "day_name"]].groupby(["Linea", "day_name"], observed=True).size().reset_index(name="conteo_fallas")
+
+        # Definimos el orden de los días de la semana y de las líneas
+        orden_dias = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+        # Aplicamos el orden a las columnas categóricas
+        fallas_dia['day_name'] = pd.Categorical(fallas_dia['day_name'], categories=orden_dias, ordered=True)
+
+        # Gráfico de barras agrupadas respetando el orden
+        fig = px.bar(
+            fallas_dia.sort_values(['day_name', 'Linea']),
+            x="day_name",
+            y="conteo_fallas",
+            color="Linea",
+            barmode="group",
+            #title="Fallas por día de la semana",
+            labels={'conteo_fallas': 'Conteo de Fallas', 'day_name': 'Día', 'Linea': 'Línea'}    
+        )
+        return fig
 
-    # Agrupamos por día y línea
-    fallas_dia = df_filtered.groupby(["Linea", "day_name"], observed=True).size().reset_index(name="conteo_fallas")
-
-    # Definimos el orden de los días de la semana y de las líneas
-    orden_dias = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-
-    # Aplicamos el orden a las columnas categóricas
-    fallas_dia['day_name'] = pd.Categorical(fallas_dia['day_name'], categories=orden_dias, ordered=True)
-
-    # Gráfico de barras agrupadas respetando el orden
-    fig = px.bar(
-        fallas_dia.sort_values(['day_name', 'Linea']),
-        x="day_name",
-        y="conteo_fallas",
-        color="Linea",
-        barmode="group",
-        #title="Fallas por día de la semana",
-        labels={'conteo_fallas': 'Conteo de Fallas', 'day_name': 'Día', 'Linea': 'Línea'}    
-    )
-
-    st.plotly_chart(fig, use_container_width=True)
+    mostrar_grafico("fallas_dia", figura, lote)
 
     # ============== Gráficos de distribución de fallas por categoría ==============
     st.subheader("Fallas por categoría")
-    # Conteo de fallas por categoría y línea
-    cat_failure = df_filtered.groupby(['Linea', 'Cat'], observed=True).size().reset_index(name="conteo_fallas")
-
-    # Gráfico de barras por categoría
-    fig = px.bar(
-        cat_failure.sort_values(['Cat', 'Linea']), 
-        x="Cat", 
-        y="conteo_fallas", 
-        color="Linea", 
-        barmode="group", 
-        #title="Fallas por categoría",
-        labels={'conteo_fallas': 'Conteo de Fallas', 'Cat': 'Categoría', 'Linea': 'Línea'}
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    def figura():
+        # Conteo de fallas por categoría y línea
+        cat_failure = resources.agregado(estado, filtros, ('Linea', 'Cat')).rename(columns={"conteo": "conteo_fallas"})
+
+        # Gráfico de barras por categoría
+        fig = px.bar(
+            cat_failure.sort_values(['Cat', 'Linea']), 
+            x="Cat", 
+            y="conteo_fallas", 
+            color="Linea", 
+            barmode="group", 
+            #title="Fallas por categoría",
+            labels={'conteo_fallas': 'Conteo de Fallas', 'Cat': 'Categoría', 'Linea': 'Línea'}
+        )
+        return fig
+
+    mostrar_grafico("fallas_categoria", figura, lote)
 
     # ============== Gráficos de distribución de fallas por sistema y línea ==============
     st.subheader("Fallas por sistema y por línea")
-    # Top 20 sistemas con más fallas, ordenados de mayor a menor en el eje y
-    fallos_sistema = df_filtered.groupby(["Linea","Sistema"], observed=True).size().reset_index(name="conteo_fallas")
-
-    fig = px.bar(
-        fallos_sistema.sort_values(['Sistema', 'Linea']),
-        y="conteo_fallas",
-        x="Sistema",
-        color= "Linea",
-        orientation='v',
-        #title="Fallas por Sistema y por Línea",
-        labels={'conteo_fallas': 'Conteo de Fallas', 'Sistema': 'Sistema', 'Linea': 'Línea'}
-    )
-    fig.update_layout(
-        xaxis={'categoryorder': 'total descending', 'tickangle': -45}
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    def figura():
+        # Top 20 sistemas con más fallas, ordenados de mayor a menor en el eje y
+        fallos_sistema = resources.agregado(estado, filtros, ("Linea","Sistema")).rename(columns={"conteo": "conteo_fallas"})
+
+        fig = px.bar(
+            fallos_sistema.sort_values(['Sistema', 'Linea']),
+            y="conteo_fallas",
+            x="Sistema",
+            color= "Linea",
+            orientation='v',
+            #title="Fallas por Sistema y por Línea",
+            labels={'conteo_fallas': 'Conteo de Fallas', 'Sistema': 'Sistema', 'Linea': 'Línea'}
+        )
+        fig.update_layout(
+            xaxis={'categoryorder': 'total descending', 'tickangle': -45}
+        )
+        return fig
+
+    mostrar_grafico("fallas_sistema", figura, lote)
 
     # ============== Gráficos de distribución de fallas por tren y categoría ==============
     st.subheader("Fallas por tren y categoría")
+    def figura():
+        # Agrupamos por tren y categoría
+        top_trenes = resources.agregado(estado, filtros, ('Veh', 'Cat')).rename(columns={"conteo": "conteo_fallas"})
 
-    # Agrupamos por tren y categoría
-    top_trenes = df_filtered.groupby(['Veh', 'Cat'], observed=True).size().reset_index(name="conteo_fallas")
+        # Se convierte a "str" para que no haya errores en el gráfico
+        #top_trenes['Veh'] = top_trenes['Veh'].astype(str)
 
-    # Se convierte a "str" para que no haya errores en el gráfico
-    #top_trenes['Veh'] = top_trenes['Veh'].astype(str)
+        # Gráfico de barras por tren
+        fig = px.bar(
+            top_trenes.sort_values(['Veh','Cat']), 
+            x="Veh", 
+            y="conteo_fallas", 
+            color="Cat", 
+            #title="Fallas por tren y categoría",
+            labels={'conteo_fallas': 'Conteo de Fallas', 'Veh': 'Id Tren', 'Cat': 'Categoría'}
+            )
+        fig.update_layout(xaxis={'categoryorder': 'total descending', 'tickangle': -45})
+        return fig
 
-    # Gráfico de barras por tren
-    fig = px.bar(
-        top_trenes.sort_values(['Veh','Cat']), 
-        x="Veh", 
-        y="conteo_fallas", 
-        color="Cat", 
-        #title="Fallas por tren y categoría",
-        labels={'conteo_fallas': 'Conteo de Fallas', 'Veh': 'Id Tren', 'Cat': 'Categoría'}
-        )
-    fig.update_layout(xaxis={'categoryorder': 'total descending', 'tickangle': -45})
-    st.plotly_chart(fig, use_container_width=True)
+    mostrar_grafico("fallas_tren", figura, lote)
 
+    dibujar(lote)
 
-with tab_4:
+
+@vistas.register("🕘Tiempos de retraso")
+def vista_retrasos():
+    lote = lote_graficos()
     
     # ============== Gráficos de retraso promedio por sistema y línea ==============
     st.subheader("Retraso promedio (en minutos) por sistema y por línea")
-    # Top 20 sistemas con más fallas, ordenados de mayor a menor en el eje y
-    promedio_retraso_sistemas = (
-        df_filtered.groupby(['Sistema', 'Linea'], observed=True)['Retraso_minutos'].mean()
-        .reset_index(name='retraso_promedio')
-        .sort_values('retraso_promedio', ascending=False)
-        #.head(20)
-    )
+    def figura():
+        # Top 20 sistemas con más fallas, ordenados de mayor a menor en el eje y
+        promedio_retraso_sistemas = (
+            resources.agregado(estado, filtros, ('Sistema', 'Linea'))
+            .sort_values('retraso_promedio', ascending=False)
+            #.head(20)
+        )
 
-    fig = px.bar(
-        promedio_retraso_sistemas.sort_values(['Sistema', 'Linea']),
-        y="retraso_promedio",
-        x="Sistema",
-        color='Linea',
-        orientation='v',
-        #title="Retraso promedio (en minutos) por Sistema y por Línea",
-        labels={'retraso_promedio': 'Retraso promedio (en minutos)', 'Sistema': 'Sistema', 'Linea': 'Línea'}
-    )
-    fig.update_layout(
-        xaxis={'categoryorder': 'total descending', 'tickangle': -45}
-    )
-    st.plotly_chart(fig, use_container_width=True)
+        fig = px.bar(
+            promedio_retraso_sistemas.sort_values(['Sistema', 'Linea']),
+            y="retraso_promedio",
+            x="Sistema",
+            color='Linea',
+            orientation='v',
+            #title="Retraso promedio (en minutos) por Sistema y por Línea",
+            labels={'retraso_promedio': 'Retraso promedio (en minutos)', 'Sistema': 'Sistema', 'Linea': 'Línea'}
+        )
+        fig.update_layout(
+            xaxis={'categoryorder': 'total descending', 'tickangle': -45}
+        )
+        return fig
+
+    mostrar_grafico("retraso_sistema", figura, lote)
 
     # ============== Gráficos de retraso promedio por categoría y línea ==============
     st.subheader("Retraso promedio (en minutos) por categoría y por línea")
-    cat_delay = (
-        df_filtered.groupby(['Linea','Cat'], observed=True)['Retraso_minutos'].mean()
-        .reset_index(name='retraso_promedio')
-        .sort_values('retraso_promedio', ascending=False)
-        #.head(20)
-    )
+    def figura():
+        cat_delay = (
+            resources.agregado(estado, filtros, ('Linea','Cat'))
+            .sort_values('retraso_promedio', ascending=False)
+            #.head(20)
+        )
 
-    # Crear gráfico de barras agrupadas
-    fig = px.bar(
-        cat_delay.sort_values(['Cat', 'Linea']),
-        x='Cat',
-        y='retraso_promedio',
-        color='Linea',
-        #title='Retraso promedio (en minutos) por Categoría y por Línea',
-        labels={'retraso_promedio': 'Retraso promedio (minutos)', 'Cat': 'Categoría', 'Linea': 'Línea'}
-    )
-    # Configurar modo agrupado
-    fig.update_layout(barmode='group')
-    st.plotly_chart(fig, use_container_width=True)
+        # Crear gráfico de barras agrupadas
+        fig = px.bar(
+            cat_delay.sort_values(['Cat', 'Linea']),
+            x='Cat',
+            y='retraso_promedio',
+            color='Linea',
+            #title='Retraso promedio (en minutos) por Categoría y por Línea',
+            labels={'retraso_promedio': 'Retraso promedio (minutos)', 'Cat': 'Categoría', 'Linea': 'Línea'}
+        )
+        # Configurar modo agrupado
+        fig.update_layout(barmode='group')
+        return fig
+
+    mostrar_grafico("retraso_categoria", figura, lote)
 
     # ============== Gráficos de retraso promedio por tren y línea ==============
     st.subheader("Retraso promedio (en minutos) por tren y por línea")
+    def figura():
+        # Top 20 sistemas con más fallas, ordenados de mayor a menor en el eje y
+        promedio_retraso_trenes = (
+            resources.agregado(estado, filtros, ('Linea','Veh'))
+            .sort_values('retraso_promedio', ascending=False)
+            #.head(20)
+        )
 
-    # Top 20 sistemas con más fallas, ordenados de mayor a menor en el eje y
-    promedio_retraso_trenes = (
-        df_filtered.groupby(['Linea','Veh'], observed=True)['Retraso_minutos'].mean()
-        .reset_index(name='retraso_promedio')
-        .sort_values('retraso_promedio', ascending=False)
-        #.head(20)
-    )
+        # Convertir Veh a string para visualización clara
+        #promedio_retraso_trenes['Veh'] = promedio_retraso_trenes['Veh'].astype(str)
+
+        fig = px.bar(
+            promedio_retraso_trenes.sort_values(['Veh', 'Linea']),
+            y="retraso_promedio",
+            x="Veh",
+            color = "Linea",
+            orientation='v',
+            #title="Retraso promedio (en minutos) por Tren y por Línea",
+            labels={'retraso_promedio': 'Retraso promedio (en minutos)', 'Veh': 'Id Tren', 'Linea': 'Línea'}
+        )
+        fig.update_layout(
+            xaxis={'categoryorder': 'total descending', 'tickangle': -45}
+        )
+        return fig
+
+    mostrar_grafico("retraso_tren", figura, lote)
+
+    dibujar(lote)
 
-    # Convertir Veh a string para visualización clara
-    #promedio_retraso_trenes['Veh'] = promedio_retraso_trenes['Veh'].astype(str)
-
-    fig = px.bar(
-        promedio_retraso_trenes.sort_values(['Veh', 'Linea']),
-        y="retraso_promedio",
-        x="Veh",
-        color = "Linea",
-        orientation='v',
-        #title="Retraso promedio (en minutos) por Tren y por Línea",
-        labels={'retraso_promedio': 'Retraso promedio (en minutos)', 'Veh': 'Id Tren', 'Linea': 'Línea'}
-    )
-    fig.update_layout(
-        xaxis={'categoryorder': 'total descending', 'tickangle': -45}
-    )
-    st.plotly_chart(fig, use_container_width=True)
 
-with tab_5:
-    # Filtrar solo fallas que causaron desalojo
-    desalojos = df_filtered[df_filtered['Causó_desalojo'] == 1]
+@vistas.register("↩ Desalojos")
+def vista_desalojos():
+    lote = lote_graficos()
 
     # ============== Gráficos de desalojo por categoría y línea ==============
     st.subheader("Desalojos por Sistema y por Línea")
-    # Agrupar por sistema y contar
-    sistemas_desalojo = (
-        desalojos.groupby(['Linea','Sistema'], observed=True)
-        .size()
-        .reset_index(name='conteo_desalojos')
-        .sort_values('conteo_desalojos', ascending=False)
-        #.head(20)
-    )
+    def figura():
+        # Agrupar por sistema y contar
+        sistemas_desalojo = (
+            resources.agregado(estado, filtros, ('Linea','Sistema'), solo_desalojos=True)
+            .rename(columns={'conteo': 'conteo_desalojos'})
+            .sort_values('conteo_desalojos', ascending=False)
+            #.head(20)
+        )
 
-    fig = px.bar(
-        sistemas_desalojo.sort_values(['Sistema', 'Linea']),
-        y="conteo_desalojos",
-        x="Sistema",
-        color='Linea',
-        orientation='v',
-        #title="Desalojos por Sistema y por Línea",
-        labels={'conteo_desalojos': 'Conteo desalojos', 'Sistema': 'Sistema', 'Linea': 'Línea'}
-    )
-    fig.update_layout(
-        xaxis={'categoryorder': 'total descending', 'tickangle': -45}
-    )
-    st.plotly_chart(fig, use_container_width=True)
+        fig = px.bar(
+            sistemas_desalojo.sort_values(['Sistema', 'Linea']),
+            y="conteo_desalojos",
+            x="Sistema",
+            color='Linea',
+            orientation='v',
+            #title="Desalojos por Sistema y por Línea",
+            labels={'conteo_desalojos': 'Conteo desalojos', 'Sistema': 'Sistema', 'Linea': 'Línea'}
+        )
+        fig.update_layout(
+            xaxis={'categoryorder': 'total descending', 'tickangle': -45}
+        )
+        return fig
+
+    mostrar_grafico("desalojos_sistema", figura, lote)
 
     # ============== Gráficos de desalojo por categoría y línea ==============
     st.subheader("Desalojos por Categoría y por Línea")
-    cat_desalojo = (
-        desalojos.groupby(['Linea','Cat'], observed=True)
-        .size()
-        .reset_index(name='conteo_desalojos')
-        .sort_values('conteo_desalojos', ascending=False)
-        #.head(20)
-    )
+    def figura():
+        cat_desalojo = (
+            resources.agregado(estado, filtros, ('Linea','Cat'), solo_desalojos=True)
+            .rename(columns={'conteo': 'conteo_desalojos'})
+            .sort_values('conteo_desalojos', ascending=False)
+            #.head(20)
+        )
 
-    # Crear gráfico de barras agrupadas
-    fig = px.bar(
-        cat_desalojo.sort_values(['Cat', 'Linea']),
-        x='Cat',
-        y='conteo_desalojos',
-        color='Linea',
-        #title='Desalojos por Categoría y por Línea',
-        labels={'conteo_desalojos': 'Conteo desalojos', 'Cat': 'Categoría', 'Linea': 'Línea'}
-    )
-    # Configurar modo agrupado
-    fig.update_layout(barmode='group')
-    st.plotly_chart(fig, use_container_width=True)
+        # Crear gráfico de barras agrupadas
+        fig = px.bar(
+            cat_desalojo.sort_values(['Cat', 'Linea']),
+            x='Cat',
+            y='conteo_desalojos',
+            color='Linea',
+            #title='Desalojos por Categoría y por Línea',
+            labels={'conteo_desalojos': 'Conteo desalojos', 'Cat': 'Categoría', 'Linea': 'Línea'}
+        )
+        # Configurar modo agrupado
+        fig.update_layout(barmode='group')
+        return fig
+
+    mostrar_grafico("desalojos_categoria", figura, lote)
 
     # ============== Gráficos de desalojo por tren y línea ==============
     st.subheader("Desalojos por Tren y por Línea")
-    # Agrupar por Veh y contar
-    trenes_desalojo = (
-        desalojos.groupby(['Linea','Veh'], observed=True)
-        .size()
-        .reset_index(name='conteo_desalojos')
-        .sort_values('conteo_desalojos', ascending=False)
-        #.head(20)
-    )
+    def figura():
+        # Agrupar por Veh y contar
+        trenes_desalojo = (
+            resources.agregado(estado, filtros, ('Linea','Veh'), solo_desalojos=True)
+            .rename(columns={'conteo': 'conteo_desalojos'})
+            .sort_values('conteo_desalojos', ascending=False)
+            #.head(20)
+        )
 
-    # Se convierte a "str" para que no haya errores en el gráfico
-    trenes_desalojo['Veh'] = trenes_desalojo['Veh'].astype(str)
-
-    fig = px.bar(
-        trenes_desalojo.sort_values(['Veh', 'Linea']),
-        y="conteo_desalojos",
-        x="Veh",
-        color='Linea',
-        orientation='v',
-        #title="Desalojos por Tren y por Línea",
-        labels={'conteo_desalojos': 'Conteo desalojos', 'Veh': 'Id Tren', 'Linea': 'Línea'}
-    )
-    fig.update_layout(
-        xaxis={'categoryorder': 'total descending', 'tickangle': -45}
-    )
-    st.plotly_chart(fig, use_container_width=True)
+        # Se convierte a "str" para que no haya errores en el gráfico
+        trenes_desalojo['Veh'] = trenes_desalojo['Veh'].astype(str)
+
+        fig = px.bar(
+            trenes_desalojo.sort_values(['Veh', 'Linea']),
+            y="conteo_desalojos",
+            x="Veh",
+            color='Linea',
+            orientation='v',
+            #title="Desalojos por Tren y por Línea",
+            labels={'conteo_desalojos': 'Conteo desalojos', 'Veh': 'Id Tren', 'Linea': 'Línea'}
+        )
+        fig.update_layout(
+            xaxis={'categoryorder': 'total descending', 'tickangle': -45}
+        )
+        return fig
+
+    mostrar_grafico("desalojos_tren", figura, lote)
 
+    dibujar(lote)
 
-with tab_6:
+
+@vistas.register("🧮 Analíticos")
+def vista_analiticos():
 
     # ============== Gráficos de Retraso promedio por sistema y causalidad de desalojo ==============
     st.subheader("Retraso promedio por sistema y causalidad de desalojo")
-    # Agrupamos por sistema y causalidad
-    causalidad = (
-        df_filtered.groupby(['Sistema', 'Causó_desalojo'], observed=True)
-        .agg(retraso_promedio=('Retraso_minutos', 'mean'))
-        .reset_index()
-    )
+    def figura():
+        # Agrupamos por sistema y causalidad
+        causalidad = (
+            resources.agregado(estado, filtros, ('Sistema', 'Causó_desalojo'))
+        )
 
-    # Convertimos a string para visualización limpia
-    #causalidad['Causó_desalojo'] = causalidad['Causó_desalojo'].astype(str)
-
-    # Gráfico de líneas o puntos comparando los grupos
-    fig = px.scatter(
-        causalidad,
-        x='Sistema',
-        y='retraso_promedio',
-        color='Causó_desalojo',
-        #title='Retraso promedio por sistema y causalidad de desalojo',
-        labels={
-            'Sistema': 'Sistema',
-            'retraso_promedio': 'Retraso promedio (minutos)',
-            'Causó_desalojo': '¿Causó desalojo?'
-        }
-    )
-    fig.update_layout(xaxis_tickangle=-45)
-    st.plotly_chart(fig, use_container_width=True)
+        # Convertimos a string para visualización limpia
+        #causalidad['Causó_desalojo'] = causalidad['Causó_desalojo'].astype(str)
+
+        # Gráfico de líneas o puntos comparando los grupos
+        fig = px.scatter(
+            causalidad,
+            x='Sistema',
+            y='retraso_promedio',
+            color='Causó_desalojo',
+            #title='Retraso promedio por sistema y causalidad de desalojo',
+            labels={
+                'Sistema': 'Sistema',
+                'retraso_promedio': 'Retraso promedio (minutos)',
+                'Causó_desalojo': '¿Causó desalojo?'
+            }
+        )
+        fig.update_layout(xaxis_tickangle=-45)
+        return fig
+
+    mostrar_grafico("causalidad", figura)
 
     # ============== Relación entre % de desalojo y minutos de retraso ==============
     st.subheader("Relación entre % de desalojo y minutos de retraso")
-    if not df_filtered['Cat'].cat.ordered:
-        df_filtered['Cat'] = df_filtered['Cat'].cat.as_ordered()
-    fig = px.scatter(
-        df_filtered, x='Porcentaje_desalojo', y='Retraso_minutos', color='Linea',
-        size='Cat', opacity=0.6, trendline='ols',
-        hover_data=['Veh', 'Sistema']
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    if len(df_filtered) > density.SCATTER_MAX_POINTS:
+        st.caption(f"{len(df_filtered):,} fallas: se muestran agrupadas en una malla de {density.BINS}×{density.BINS} por línea.")
+
+    def figura():
+        if len(df_filtered) <= density.SCATTER_MAX_POINTS:
+            datos_scatter = df_filtered[['Porcentaje_desalojo', 'Retraso_minutos', 'Linea', 'Cat', 'Veh', 'Sistema']]
+            if not datos_scatter['Cat'].cat.ordered:
+                datos_scatter['Cat'] = datos_scatter['Cat'].cat.as_ordered()
+            fig = px.scatter(
+                datos_scatter, x='Porcentaje_desalojo', y='Retraso_minutos', color='Linea',
+                size='Cat', opacity=0.6, trendline='ols',
+                hover_data=['Veh', 'Sistema']
+            )
+        else:
+            # Modo agregado: un marcador por celda de la malla (tamaño = conteo de fallas)
+            celdas, rectas = densidad_scatter(df_filtered, estado.version, filtros)
+            fig = px.scatter(
+                celdas, x='Porcentaje_desalojo', y='Retraso_minutos', color='Linea',
+                size='conteo', opacity=0.6,
+                hover_data=['conteo', 'y_promedio'],
+                labels={'conteo': 'Conteo de Fallas', 'y_promedio': 'Retraso promedio (minutos)'}
+            )
+            for _, recta in rectas.iterrows():
+                x = [recta['x_min'], recta['x_max']]
+                fig.add_scatter(
+                    x=x,
+                    y=[recta['intercepto'] + recta['pendiente'] * v for v in x],
+                    mode='lines',
+                    name=f"OLS L{recta['Linea']}",
+                    line=dict(dash='dash'),
+                    showlegend=True
+                )
+        return fig
+
+    mostrar_grafico("scatter_desalojo_retraso", figura)
 
     # ============== Gráfico de correlación ==============
     st.subheader("Heatmap de correlaciones")
-    num_cols = df_filtered.select_dtypes(include=["int64", "float64"]).columns
-    corr_spearman = df_filtered[num_cols].corr(method="spearman") # <-- Correlación de Spearman
-    fig = px.imshow(corr_spearman, text_auto=True, color_continuous_scale="RdBu_r", zmin=-1, zmax=1)
-    st.plotly_chart(fig, use_container_width=True)
+    metodo = st.radio("Método", correlation.METHODS, format_func=str.capitalize, horizontal=True, key="correlaciones_metodo")
+    muestreo = False
+    if len(df_filtered) > correlation.MAX_ROWS:
+        muestreo = st.checkbox(f"Aproximar con una muestra de {correlation.MAX_ROWS:,} filas", key="correlaciones_muestreo")
+    def figura():
+        corr = resources.correlaciones(estado, filtros, metodo, muestreo)
+        fig = px.imshow(corr, text_auto=True, color_continuous_scale="RdBu_r", zmin=-1, zmax=1)
+        return fig
+
+    mostrar_grafico(f"correlaciones_{metodo}_{'muestra' if muestreo else 'completa'}", figura)
 
 
-with tab_7:
+@vistas.register("🔁 Confiabilidad")
+def vista_confiabilidad():
+    st.subheader("Confiabilidad por tren y sistema")
+    col1, col2 = st.columns(2)
+    with col1:
+        repeticion = st.slider("Falla repetida: mismo tren y sistema en menos de (días)", 1, 180, reliability.REPEAT_DAYS, key="confiabilidad_repeticion")
+    with col2:
+        ventana = st.slider("Ventana de la tasa móvil (días)", 7, 365, reliability.WINDOW_DAYS, key="confiabilidad_ventana")
+
+    with perfil.section("confiabilidad") as seccion:
+        eventos = resources.confiabilidad(estado, filtros, ventana, repeticion)
+        seccion['rows'] = len(eventos)
+    flota = reliability.fleet(eventos)
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Fallas con tren y fecha", f"{flota['fallas']:,}")
+    c2.metric("MTBF promedio por tren", "—" if flota['mtbf_dias'] is None else f"{flota['mtbf_dias']:.1f} días")
+    c3.metric("Fallas repetidas", "—" if flota['pct_repetidas'] is None else f"{flota['pct_repetidas']:.1f}%")
+
+    # ============== MTBF por tren ==============
+    st.subheader("Tiempo medio entre fallas por tren")
+    def figura():
+        vehiculos = reliability.by_vehicle(eventos).dropna(subset=['mtbf_dias'])
+        vehiculos['Veh'] = vehiculos['Veh'].astype(str)
+        fig = px.bar(
+            vehiculos.sort_values('mtbf_dias'), x='Veh', y='mtbf_dias', color='pct_repetidas',
+            hover_data=['fallas', 'repetidas', 'tasa_max_30d'],
+            labels={
+                'Veh': 'Vehículo',
+                'mtbf_dias': 'MTBF (días)',
+                'pct_repetidas': '% repetidas',
+                'tasa_max_30d': 'Tasa máxima (fallas/30 días)'
+            }
+        )
+        fig.update_layout(xaxis_type='category', xaxis_tickangle=-45)
+        return fig
+
+    mostrar_grafico(f"mtbf_tren_r{repeticion}_v{ventana}", figura)
+
+    # ============== Resumen por tren y sistema ==============
+    st.subheader("Resumen por tren y sistema")
+    resumen = reliability.by_system(eventos).sort_values(['repetidas', 'fallas'], ascending=False, kind='stable')
+    st.dataframe(resumen, use_container_width=True, hide_index=True)
+    st.download_button(
+        "Descargar resumen CSV",
+        data=resumen.to_csv(sep=';', index=False).encode('utf-8'),
+        file_name="confiabilidad_tren_sistema.csv",
+        mime="text/csv",
+        key="confiabilidad_descarga"
+    )
+
+
+@vistas.register("🤖 Predicciones-ML")
+def vista_predicciones():
     st.subheader("Analítica Predictiva")
     st.markdown("**Predicción de desalojo**")
 
@@ -514,7 +738,6 @@ with tab_7:
 
     if not submitted:
         st.warning("Antes de realizar una predicción, verifica que los datos anteriores sean correctos!")
-        st.stop()
 
     if submitted:
         # Construir el diccionario de entrada
@@ -528,31 +751,76 @@ with tab_7:
             'long_desc': len(desc)
         }
 
-        # Cargar el pipeline de modelos entrenados
-        pipeline_classif = './artifacts/pipeline_rf_model_class.pkl'
-        loaded_clf = joblib.load(pipeline_classif)
-
-        pipeline_regr = './artifacts/pipeline_rf_model_regr.pkl'
-        loaded_regr = joblib.load(pipeline_regr)
-
-        # Ejecutar predicciones
-        y_pred_clf = loaded_clf.predict(pd.DataFrame([x_sample]))
-        y_pred_regr = loaded_regr.predict(pd.DataFrame([x_sample]))
+        # Pipelines de modelos entrenados (cacheados por proceso)
+        with perfil.section("load_models"):
+            loaded_clf, loaded_regr = resources.load_models()
 
-        # Probabilidad de desalojo
-        y_proba = loaded_clf.predict_proba(pd.DataFrame([x_sample]))
+        # Ejecutar predicciones (un solo DataFrame para ambos modelos)
+        prediccion = models.score(loaded_clf, loaded_regr, pd.DataFrame([x_sample]))
 
         # Mostrar resultados
         st.markdown(
-            f"<div style='text-align:center; font-size:2rem; font-weight:bold; color:blue;'>🔮 Minutos de retraso estimado: <span style='color:#1f77b4'>{round(y_pred_regr[0],2)}</span></div>",
+            f"<div style='text-align:center; font-size:2rem; font-weight:bold; color:blue;'>🔮 Minutos de retraso estimado: <span style='color:#1f77b4'>{round(prediccion['retraso_estimado'].iloc[0],2)}</span></div>",
             unsafe_allow_html=True
         )
 
         st.markdown(
-            f"<div style='text-align:center; font-size:2rem; font-weight:bold; color:blue;'>🔮 Probabilidad de desalojo: <span style='color:#1f77b4'>{round(y_proba[0][1]*100,2)}% </span></div>",
+            f"<div style='text-align:center; font-size:2rem; font-weight:bold; color:blue;'>🔮 Probabilidad de desalojo: <span style='color:#1f77b4'>{round(prediccion['prob_desalojo'].iloc[0]*100,2)}% </span></div>",
             unsafe_allow_html=True
         )
 
         #st.subheader("Probabilidades de desalojo")
         #proba_df = pd.DataFrame(y_proba, columns=loaded_clf.classes_)
-        #st.dataframe(proba_df, use_container_width=True)
\ No newline at end of file
+        #st.dataframe(proba_df, use_container_width=True)
+
+    # ============== Predicción por lote ==============
+    st.markdown("**Predicción por lote**")
+    st.caption("Archivo CSV o Parquet con las columnas year, month, day, Linea, Sistema, Veh y long_desc (o Fecha y Descripcion).")
+    archivo = st.file_uploader("Incidentes a puntuar", type=["csv", "parquet"], key="lote_prediccion")
+
+    if archivo is not None:
+        try:
+            salida, total = puntuar_lote(archivo.getvalue(), archivo.name)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.success(f"{total} incidentes puntuados.")
+            st.download_button(
+                "Descargar predicciones",
+                data=salida,
+                file_name=f"predicciones_{archivo.name.rsplit('.', 1)[0]}.csv",
+                mime="text/csv"
+            )
+
+
+vista_activa = st.radio("Vista", vistas.titles, horizontal=True, label_visibility="collapsed", key="vista_activa")
+with perfil.section(f"vista: {vista_activa}", rows=len(df_filtered)):
+    vistas.render(vista_activa)
+
+# --- Primer pintado de la sesión (frío o con el precalentamiento terminado) ---
+if "primer_pintado_ms" not in st.session_state:
+    st.session_state["primer_pintado_ms"] = (time.perf_counter() - inicio_rerun) * 1000
+    warmup.progress.record_first_paint(st.session_state["primer_pintado_ms"], cache_caliente)
+
+if warmup.progress.started is not None:
+    with st.sidebar.expander("🔥 Precalentamiento", expanded=warmup.progress.running):
+        avance = warmup.progress
+        if avance.running:
+            st.progress(avance.done / max(avance.total, 1), text=f"{avance.done}/{avance.total}: {avance.current or '...'}")
+        else:
+            st.caption(f"Listo: {avance.total} pasos en {avance.finished - avance.started:.1f} s")
+        for nombre, error in avance.errors:
+            st.caption(f"⚠️ {nombre}: {error}")
+        st.caption("Primer pintado por sesión")
+        st.dataframe(pd.DataFrame(avance.summary()).T, use_container_width=True)
+
+# --- Panel de perfil (sólo con la instrumentación activa) ---
+if perfil.enabled:
+    registro = perfil.finish()
+    with st.sidebar.expander("🛠️ Perfil del rerun", expanded=True):
+        st.metric("Tiempo total del rerun", f"{registro['total_ms']:,.0f} ms")
+        st.dataframe(pd.DataFrame(registro['sections']), hide_index=True, use_container_width=True)
+        st.caption("Caché (acumulado del proceso)")
+        st.dataframe(pd.DataFrame(profiling.cache_summary()), hide_index=True, use_container_width=True)
+        st.caption("Resultados compartidos entre sesiones (agregados y figuras)")
+        st.dataframe(pd.DataFrame([resultados.stats()]), hide_index=True, use_container_width=True)
@@ -0,0 +1 @@
+"""Utilidades de datos para el tablero de análisis de fallas en trenes MTY."""
@@ -0,0 +1,311 @@
+"""Backends de consulta para los agregados del tablero.
+
+Los conteos, promedios de ``Retraso_minutos`` y desalojos por grupo, y los
+conteos por periodo de las tendencias, se piden como una consulta
+``rollup(filtros, by, solo_desalojos)`` con el estado de filtros canónico.
+El resultado tiene siempre las columnas de ``cube.rollup``.
+
+- ``pandas`` (por defecto): roll-up de los cubos en memoria del ``FailureStore``
+  (``mty_trains.cube``), o de las filas seleccionadas cuando ningún cubo
+  reduce la consulta.
+- ``arrow``: archivos Parquet particionados por ``year``/``Linea`` en
+  ``data/particiones/`` (``MTY_PARTICIONES``), consultados con
+  ``pyarrow.dataset`` + Acero. Los filtros de año y línea descartan
+  particiones completas, el resto se empuja al escaneo (estadísticas de los
+  row groups) y la agregación corre en streaming, así que a Python sólo
+  vuelve la tabla agregada. Cada delta ingestado se agrega a las particiones
+  que toca y éstas se compactan en un solo archivo.
+
+Se elige con ``MTY_BACKEND=pandas|arrow``. Las particiones tienen las mismas
+filas que el almacén en memoria (dataset + deltas), que se carga igual con
+cualquiera de los dos: las opciones de los filtros, la búsqueda y las vistas
+que trabajan con filas (tabla del dataset, scatter, correlaciones,
+predicciones) salen de él. El backend ``arrow`` no ahorra memoria; sólo
+ejecuta los agregados con Acero en lugar de pandas.
+
+Uso desde la raíz del repo (dataset + deltas ingestados)::
+
+    python -m mty_trains.backend
+"""
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import acero
+
+from mty_trains import cube, search, snapshot
+
+BACKEND = os.environ.get("MTY_BACKEND", "pandas")
+PARTITIONS_DIR = Path(os.environ.get("MTY_PARTICIONES", "./data/particiones"))
+
+PARTITION_KEYS = ['year', 'Linea']
+
+# Columnas de los archivos particionados: las llaves del cubo que usan las vistas, el
+# retraso y el texto normalizado para la búsqueda (Descripcion + Correccion)
+SCHEMA = pa.schema([
+    ('year', pa.int32()),
+    ('Linea', pa.int32()),
+    ('Sistema', pa.string()),
+    ('Cat', pa.int32()),
+    ('Veh', pa.int32()),
+    ('month', pa.int32()),
+    ('periodo_semana', pa.timestamp('ns')),
+    ('periodo_mes', pa.timestamp('ns')),
+    ('Causó_desalojo', pa.int8()),
+    ('Retraso_minutos', pa.float64()),
+    ('texto', pa.string()),
+])
+_PARTITIONING = ds.partitioning(pa.schema([SCHEMA.field(key) for key in PARTITION_KEYS]), flavor='hive')
+
+# Filas por row group: las estadísticas de cada uno permiten saltarlo al filtrar
+ROW_GROUP_SIZE = 64 * 1024
+
+# Archivo de una partición compactada (los demás se reescriben en él)
+COMPACTED_FILE = "compactado.parquet"
+
+_MEASURES = [
+    ([], "hash_count_all", None, "conteo"),
+    ("Retraso_minutos", "hash_sum", pc.ScalarAggregateOptions(min_count=0), "retraso_suma"),
+    ("Retraso_minutos", "hash_count", None, "retraso_n"),
+]
+
+
+class PandasBackend:
+    """Roll-ups de los cubos en memoria, o de las filas seleccionadas si ningún cubo reduce la consulta.
+
+    ``filtered(filtros, nombre)`` devuelve las celdas filtradas del cubo ``nombre``
+    y ``selected(filtros)`` las posiciones de las filas; por defecto se calculan
+    sin caché.
+    """
+
+    name = "pandas"
+
+    def __init__(self, state, filtered=None, selected=None):
+        self.state = state
+        self.filtered = filtered or (lambda filtros, nombre: cube.filter_cube(state.cubes[nombre], *filtros[:-1]))
+        self.selected = selected or (lambda filtros: _positions(state, filtros))
+
+    @property
+    def version(self):
+        return self.state.version
+
+    def rollup(self, filtros, by, solo_desalojos=False):
+        nombre = self.state.cubes.choose(filtros, by, solo_desalojos)
+        if nombre is None:
+            return cube.rollup_rows(self.state.df, self.selected(filtros), by, solo_desalojos)
+        celdas = self.filtered(filtros, nombre)
+        if solo_desalojos:
+            celdas = cube.desalojos(celdas)
+        return cube.rollup(celdas, list(by))
+
+
+def _positions(state, filtros):
+    posiciones = state.index.select(*filtros[:-1])
+    return state.text.search(filtros[-1], posiciones) if filtros[-1] else posiciones
+
+
+def _values(series):
+    """Columna categórica como sus valores (las categorías ya tienen el tipo del dato)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(series.cat.categories.dtype)
+    return series
+
+
+def _folded(series):
+    # Se normaliza cada texto distinto una vez (en modo compacto son categorías)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        folded = np.array([search.fold(c) for c in series.cat.categories] + [''], dtype=object)
+        return pd.Series(folded[series.cat.codes.to_numpy()], index=series.index)
+    return series.fillna('').map(search.fold)
+
+
+def to_table(df):
+    """Filas del dataset (ya tipado, con ``DERIVED_COLS``) con el esquema ``SCHEMA``."""
+    frame = pd.DataFrame({
+        name: _values(df[name]) for name in SCHEMA.names if name != 'texto'
+    })
+    frame['texto'] = _folded(df['Descripcion']) + ' ' + _folded(df['Correccion'])
+    return pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False)
+
+
+def write_partitions(df, root=PARTITIONS_DIR, name="parte"):
+    """Agrega las filas de ``df`` a ``root`` como ``year=/Linea=/<name>-N.parquet``."""
+    ds.write_dataset(
+        to_table(df), root, format='parquet', partitioning=_PARTITIONING,
+        basename_template=f"{name}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+        min_rows_per_group=ROW_GROUP_SIZE, max_rows_per_group=ROW_GROUP_SIZE,
+    )
+    return Path(root)
+
+
+def _partition_dirs(df, root):
+    """Directorios ``year=/Linea=`` de ``root`` donde caen las filas de ``df``."""
+    llaves = pd.DataFrame({key: _values(df[key]) for key in PARTITION_KEYS}).drop_duplicates()
+    return [
+        Path(root, *(f"{key}={valor}" for key, valor in zip(PARTITION_KEYS, fila)))
+        for fila in llaves.itertuples(index=False)
+    ]
+
+
+def compact_partition(path):
+    """Reescribe los archivos Parquet de la partición ``path`` en ``COMPACTED_FILE``.
+
+    El archivo nuevo reemplaza al anterior de forma atómica y después se
+    borran los que absorbió.
+    """
+    path = Path(path)
+    files = sorted(path.glob("*.parquet"))
+    if len(files) <= 1:
+        return path
+    # Los archivos de la partición no guardan las llaves (van en la ruta)
+    esquema = pa.schema([field for field in SCHEMA if field.name not in PARTITION_KEYS])
+    table = ds.dataset([str(f) for f in files], schema=esquema, format='parquet').to_table()
+    tmp = path / (COMPACTED_FILE + ".tmp")
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE)
+    tmp.replace(path / COMPACTED_FILE)
+    for f in files:
+        if f.name != COMPACTED_FILE:
+            f.unlink()
+    return path
+
+
+def append_partitions(df, root=PARTITIONS_DIR, name="parte"):
+    """Agrega las filas de ``df`` a ``root`` y compacta las particiones que tocaron.
+
+    Así cada partición queda en un solo archivo aunque se ingesten muchos
+    deltas chicos.
+    """
+    write_partitions(df, root, name)
+    for path in _partition_dirs(df, root):
+        compact_partition(path)
+    return Path(root)
+
+
+def _fingerprint(root):
+    """Huella de los archivos de ``root`` (nombre, tamaño, mtime): cambia al agregar o reescribir."""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in sorted(Path(root).rglob("*.parquet")):
+        stat = path.stat()
+        digest.update(f"{path.relative_to(root)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def _expression(filtros, solo_desalojos=False):
+    lineas, sistemas, categorias, vehiculos, anios, consulta = filtros
+    expr = (
+        (pc.field('year') >= anios[0]) & (pc.field('year') <= anios[1]) &
+        pc.field('Linea').isin(list(lineas)) &
+        pc.field('Sistema').isin(list(sistemas)) &
+        pc.field('Cat').isin(list(categorias)) &
+        pc.field('Veh').isin(list(vehiculos))
+    )
+    if solo_desalojos:
+        expr &= pc.field('Causó_desalojo') == 1
+    # Mismos términos que search.TextIndex: prefijo o palabra completa, en cualquiera de los dos textos
+    for term, prefix in consulta:
+        pattern = r"(^|[^a-z0-9])" + re.escape(term) + ("" if prefix else r"([^a-z0-9]|$)")
+        expr &= pc.match_substring_regex(pc.field('texto'), pattern)
+    return expr
+
+
+class ArrowBackend:
+    """Consultas sobre el dataset particionado en ``root`` (Parquet + Acero)."""
+
+    name = "arrow"
+
+    def __init__(self, root=PARTITIONS_DIR):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self.version = None
+        self.refresh()
+
+    def refresh(self):
+        """Vuelve a listar los archivos si cambiaron (p. ej. por un delta ingestado).
+
+        Recorre todo el árbol de particiones: el tablero lo llama una vez por
+        rerun (``resources.refrescar_consultas``), no en cada consulta.
+        """
+        if not self.root.is_dir():
+            raise FileNotFoundError(f"No hay particiones en {self.root}; generarlas con `python -m mty_trains.backend`.")
+        version = _fingerprint(self.root)
+        with self._lock:
+            if version != self.version:
+                self.dataset = ds.dataset(self.root, schema=SCHEMA, format='parquet', partitioning=_PARTITIONING)
+                self.version = version
+        return self
+
+    def _aggregate(self, expr, columns, by):
+        plan = acero.Declaration.from_sequence([
+            # El filtro del escaneo poda particiones y row groups; el nodo filter lo aplica a las filas
+            acero.Declaration("scan", acero.ScanNodeOptions(self.dataset, filter=expr, columns=columns)),
+            acero.Declaration("filter", acero.FilterNodeOptions(expr)),
+            acero.Declaration("aggregate", acero.AggregateNodeOptions(_MEASURES, keys=by)),
+        ])
+        return plan.to_table(use_threads=True)
+
+    def rollup(self, filtros, by, solo_desalojos=False):
+        by = list(by)
+        expr = _expression(filtros, solo_desalojos)
+        columns = sorted(set(by) | {'Retraso_minutos'} | ({'texto'} if filtros[-1] else set()))
+        try:
+            table = self._aggregate(expr, columns, by)
+        except FileNotFoundError:
+            # Una compactación borró archivos del listado anterior: se vuelve a listar
+            table = self.refresh()._aggregate(expr, columns, by)
+        grouped = table.to_pandas()
+        grouped = grouped[by + ['conteo', 'retraso_suma', 'retraso_n']].sort_values(by, kind='stable')
+        for col in by:
+            if col in snapshot.CATEGORICAL_COLS:
+                grouped[col] = grouped[col].astype('category')
+            elif pa.types.is_timestamp(SCHEMA.field(col).type):
+                grouped[col] = grouped[col].astype('datetime64[ns]')
+        grouped['conteo'] = grouped['conteo'].astype('int64')
+        # Mismas columnas que cube.rollup
+        grouped['retraso_promedio'] = grouped['retraso_suma'] / grouped['retraso_n'].where(grouped['retraso_n'] > 0)
+        return grouped.drop(columns='retraso_n').reset_index(drop=True)
+
+
+def build(root=PARTITIONS_DIR):
+    """Reescribe ``root`` con el dataset más los deltas ingestados; devuelve las filas."""
+    from mty_trains import ingest, store
+
+    root = Path(root)
+    tmp = root.with_name(root.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    almacen = store.FailureStore(snapshot.load_dataset())
+    almacen.sync(ingest.DELTAS_DIR)
+    filas = len(almacen.state.df)
+    write_partitions(almacen.state.df, tmp, name="base")
+
+    # Se reemplaza el directorio completo ya escrito
+    shutil.rmtree(root, ignore_errors=True)
+    tmp.replace(root)
+    return filas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera el dataset particionado (year/Linea) del backend arrow.")
+    parser.add_argument('--dir', type=Path, default=PARTITIONS_DIR)
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    filas = build(args.dir)
+    archivos = len(list(args.dir.rglob("*.parquet")))
+    print(f"{filas} filas en {archivos} archivos bajo {args.dir} ({time.perf_counter() - inicio:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
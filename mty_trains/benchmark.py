@@ -0,0 +1,395 @@
+"""Benchmark sin interfaz de los cálculos de cada vista del tablero.
+
+Para cada escala se genera un dataset sintético (``mty_trains.synthetic``) y
+se mide el tiempo de pared y el pico de memoria (``tracemalloc``) de cada
+paso: carga, filtros, búsqueda de texto, agregaciones, tendencias,
+correlación, scatter OLS, confiabilidad (MTBF), armado de gráficos y scoring de modelos. Donde el tablero reemplazó un cálculo, también se mide
+la versión anterior (pasos ``*_legacy``) para tener la comparación en números.
+El resultado se escribe como JSON.
+
+Uso desde la raíz del repo::
+
+    python -m mty_trains.benchmark --scales 100000 1000000 --out benchmark_results.json
+"""
+import argparse
+import gc
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+import statsmodels.api as sm
+
+from mty_trains import backend, charts, correlation, density, models, reliability, search, snapshot, store, synthetic, timeseries
+
+SCALES = [100_000, 1_000_000, 10_000_000]
+
+# Pasos registrados en orden: (nombre, función(ctx))
+STEPS = []
+
+
+def step(name):
+    def decorator(func):
+        STEPS.append((name, func))
+        return func
+    return decorator
+
+
+class Context:
+    """Estado compartido entre los pasos de una escala."""
+
+    def __init__(self, df, workdir, artifacts_dir):
+        self.df = df
+        self.workdir = Path(workdir)
+        self.artifacts_dir = Path(artifacts_dir)
+        self.csv_path = self.workdir / "fallas.csv"
+        self.state = None
+        self.positions = None
+        self.arrow = None
+        self.ranks = None
+
+        # Filtro por defecto del tablero (todo seleccionado) y uno parcial típico
+        cats = {col: list(df[col].cat.categories) for col in ('Linea', 'Sistema', 'Cat', 'Veh')}
+        anios = (int(df['year'].min()), int(df['year'].max()))
+        self.filtros = (cats['Linea'], cats['Sistema'], cats['Cat'], cats['Veh'], anios)
+        self.filtros_parcial = (
+            cats['Linea'][:1], cats['Sistema'][::2], cats['Cat'], cats['Veh'][::2],
+            (anios[0] + 2, anios[1] - 2),
+        )
+
+
+def _mask(df, filtros):
+    lineas, sistemas, categorias, vehiculos, anios = filtros
+    return (
+        (df['Linea'].isin(lineas)) &
+        (df['Sistema'].isin(sistemas)) &
+        (df['Cat'].isin(categorias)) &
+        (df['Veh'].isin(vehiculos)) &
+        (df['year'].between(anios[0], anios[1]))
+    )
+
+
+# ----------------------------- Carga -----------------------------
+
+@step("load_csv")
+def load_csv(ctx):
+    return snapshot.read_csv(ctx.csv_path)
+
+
+@step("build_snapshot")
+def build_snapshot(ctx):
+    return snapshot.build_snapshot(ctx.csv_path)
+
+
+@step("load_snapshot")
+def load_snapshot(ctx):
+    return snapshot.load_dataset(ctx.csv_path)
+
+
+@step("build_store")
+def build_store(ctx):
+    ctx.state = store.FailureStore(ctx.df).state
+    return ctx.state
+
+
+# ----------------------------- Filtros -----------------------------
+
+@step("filter_legacy")
+def filter_legacy(ctx):
+    return ctx.df[_mask(ctx.df, ctx.filtros_parcial)]
+
+
+@step("filter_bitmap")
+def filter_bitmap(ctx):
+    return ctx.state.index.select(*ctx.filtros_parcial)
+
+
+# Lo que se teclea en la búsqueda hasta completar cada consulta
+_BUSQUEDAS = [q[:i] for q in ("pantografo", "puerta no abre", "cambio de zapatas") for i in range(3, len(q) + 1)]
+
+
+@step("search_contains_legacy")
+def search_contains_legacy(ctx):
+    textos = [ctx.df[col].astype(str).str.lower() for col in search.TEXT_COLS]
+    return [
+        int(np.logical_or.reduce([t.str.contains(q, regex=False).to_numpy() for t in textos]).sum())
+        for q in _BUSQUEDAS
+    ]
+
+
+@step("search_index")
+def search_index(ctx):
+    return [len(ctx.state.text.search(search.parse_query(q))) for q in _BUSQUEDAS]
+
+
+# ----------------------------- Agregaciones -----------------------------
+
+_GROUPBYS = [
+    ['Linea', 'Cat'], ['Linea', 'Sistema'], ['Veh', 'Cat'],
+    ['Sistema', 'Linea'], ['Linea', 'Veh'], ['Sistema', 'Causó_desalojo'],
+]
+
+
+@step("groupbys_legacy")
+def groupbys_legacy(ctx):
+    df = ctx.df[_mask(ctx.df, ctx.filtros)]
+    desalojos = df[df['Causó_desalojo'] == 1]
+    out = [df.groupby(['Linea', 'day_name'], observed=True).size()]
+    for by in _GROUPBYS:
+        out.append(df.groupby(by, observed=True).size())
+        out.append(df.groupby(by, observed=True)['Retraso_minutos'].mean())
+        out.append(desalojos.groupby(by, observed=True).size())
+    return out
+
+
+@step("groupbys_cube")
+def groupbys_cube(ctx):
+    # Cubo más chico que responde cada consulta, o las filas seleccionadas (como el tablero)
+    motor = backend.PandasBackend(ctx.state)
+    filtros = ctx.filtros + ((),)
+    positions = ctx.state.index.select(*ctx.filtros)
+    out = [ctx.df[['Linea', 'day_name']].take(positions).groupby(['Linea', 'day_name'], observed=True).size()]
+    for by in _GROUPBYS:
+        out.append(motor.rollup(filtros, by))
+        out.append(motor.rollup(filtros, by, solo_desalojos=True))
+    return out
+
+
+@step("build_partitions")
+def build_partitions(ctx):
+    root = backend.write_partitions(ctx.df, ctx.workdir / "particiones", name="base")
+    ctx.arrow = backend.ArrowBackend(root)
+    return root
+
+
+@step("groupbys_arrow")
+def groupbys_arrow(ctx):
+    filtros = ctx.filtros + ((),)
+    return [
+        ctx.arrow.rollup(filtros, by, solo_desalojos)
+        for by in _GROUPBYS for solo_desalojos in (False, True)
+    ]
+
+
+# ----------------------------- Tendencias -----------------------------
+
+@step("trends_legacy")
+def trends_legacy(ctx):
+    df = ctx.df[_mask(ctx.df, ctx.filtros)]
+    semana = (
+        df.assign(week=df['Fecha'].dt.isocalendar().week, year=df['Fecha'].dt.isocalendar().year)
+        .groupby(["Linea", "year", "week"], observed=True).size().reset_index(name="conteo_fallas")
+    )
+    semana["Periodo"] = pd.to_datetime(
+        semana["year"].astype(str) + "-W" + semana["week"].astype(str) + "-1", format="%G-W%V-%u"
+    )
+    mes = df.groupby(["Linea", "year", "month"], observed=True).size().reset_index(name="conteo_fallas")
+    mes["Periodo"] = pd.to_datetime(mes[["year", "month"]].assign(day=1))
+    out = []
+    for serie in (semana, mes):
+        for linea in serie['Linea'].cat.categories:
+            datos = serie[serie['Linea'] == linea].sort_values('Periodo')
+            out.append(datos['conteo_fallas'].rolling(window=12, min_periods=1).mean())
+    return out
+
+
+@step("trends_timeseries")
+def trends_timeseries(ctx):
+    motor = backend.PandasBackend(ctx.state)
+    filtros = ctx.filtros + ((),)
+    return [
+        timeseries.trend(motor.rollup(filtros, ['Linea', periodo]), 'Linea', periodo)
+        for periodo in timeseries.PERIOD_KEYS
+    ]
+
+
+@step("trends_arrow")
+def trends_arrow(ctx):
+    filtros = ctx.filtros + ((),)
+    return [
+        timeseries.trend(ctx.arrow.rollup(filtros, ['Linea', periodo]), 'Linea', periodo)
+        for periodo in timeseries.PERIOD_KEYS
+    ]
+
+
+# ----------------------------- Analíticos -----------------------------
+
+@step("spearman")
+def spearman(ctx):
+    num_cols = ctx.df.select_dtypes(include="number").columns
+    return ctx.df[num_cols].corr(method="spearman")
+
+
+@step("build_ranks")
+def build_ranks(ctx):
+    ctx.ranks = correlation.RankIndex(ctx.df)
+    return ctx.ranks
+
+
+@step("spearman_ranks")
+def spearman_ranks(ctx):
+    return ctx.ranks.matrix(ctx.df, ctx.state.index.select(*ctx.filtros))
+
+
+@step("ols_legacy")
+def ols_legacy(ctx):
+    out = []
+    for _, datos in ctx.df.groupby('Linea', observed=True):
+        X = sm.add_constant(datos['Porcentaje_desalojo'].astype(float))
+        out.append(sm.OLS(datos['Retraso_minutos'].astype(float), X, missing='drop').fit().params)
+    return out
+
+
+@step("ols_density")
+def ols_density(ctx):
+    datos = ctx.df[['Porcentaje_desalojo', 'Retraso_minutos', 'Linea']]
+    return (
+        density.line_fits(datos, 'Porcentaje_desalojo', 'Retraso_minutos', 'Linea'),
+        density.bin_points(datos, 'Porcentaje_desalojo', 'Retraso_minutos', 'Linea'),
+    )
+
+
+# ----------------------------- Confiabilidad -----------------------------
+
+@step("reliability_legacy")
+def reliability_legacy(ctx):
+    df = ctx.df[_mask(ctx.df, ctx.filtros_parcial)].dropna(subset=['Fecha'])
+    df = df.sort_values(['Veh', 'Sistema', 'Fecha'], kind='stable')
+    dias = df.groupby(['Veh', 'Sistema'], observed=True)['Fecha'].diff().dt.days
+    return (dias <= reliability.REPEAT_DAYS).groupby(df['Veh'], observed=True).mean()
+
+
+@step("reliability_index")
+def reliability_index(ctx):
+    eventos = ctx.state.reliability.events(ctx.df, ctx.state.index.select(*ctx.filtros_parcial))
+    return reliability.by_vehicle(eventos)
+
+
+# ----------------------------- Gráficos -----------------------------
+
+# Barras de las vistas de distribución, retrasos y desalojos: (agrupación, solo desalojos, y)
+_BARRAS = [
+    (['Linea', 'Cat'], False, 'conteo'), (['Linea', 'Sistema'], False, 'conteo'), (['Veh', 'Cat'], False, 'conteo'),
+    (['Sistema', 'Linea'], False, 'retraso_promedio'), (['Linea', 'Cat'], False, 'retraso_promedio'),
+    (['Linea', 'Veh'], False, 'retraso_promedio'), (['Linea', 'Sistema'], True, 'conteo'),
+    (['Linea', 'Cat'], True, 'conteo'), (['Linea', 'Veh'], True, 'conteo'),
+]
+
+
+def _charts(ctx, parallel):
+    # La plantilla de plotly se carga en la primera figura: fuera de la comparación
+    pio.templates[pio.templates.default]
+    motor = backend.PandasBackend(ctx.state)
+    filtros = ctx.filtros + ((),)
+
+    def barra(by, solo_desalojos, y):
+        def construir():
+            datos = motor.rollup(filtros, by, solo_desalojos)
+            return px.bar(datos.sort_values(by[::-1]), x=by[1], y=y, color=by[0]).to_json()
+        return construir
+
+    lote = charts.ChartBatch(parallel=parallel)
+    for i, (by, solo_desalojos, y) in enumerate(_BARRAS):
+        lote.add(i, barra(by, solo_desalojos, y))
+    return [len(figura) for _, _, figura in lote.results()]
+
+
+@step("charts_sequential")
+def charts_sequential(ctx):
+    return _charts(ctx, parallel=False)
+
+
+@step("charts_threads")
+def charts_threads(ctx):
+    return _charts(ctx, parallel=True)
+
+
+# ----------------------------- Modelos -----------------------------
+
+@step("model_scoring")
+def model_scoring(ctx):
+    if not (ctx.artifacts_dir / models.CLASSIFIER_FILE).exists():
+        return None
+    loaded_clf, loaded_regr = models.load_pipelines(ctx.artifacts_dir)
+    return sum(len(chunk) for chunk in models.score_batches(loaded_clf, loaded_regr, ctx.df))
+
+
+# ----------------------------- Ejecución -----------------------------
+
+def measure(func, ctx, memory=True):
+    """Ejecuta ``func(ctx)``; devuelve (segundos, pico MB o None, resultado)."""
+    gc.collect()
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func(ctx)
+    finally:
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 2**20 if memory else None
+        if memory:
+            tracemalloc.stop()
+    return seconds, peak, result
+
+
+def run(scales=SCALES, steps=None, artifacts_dir=models.ARTIFACTS_DIR, memory=True, seed=0, log=print):
+    source = snapshot.load_dataset()
+    resultados = []
+    for scale in scales:
+        df = synthetic.generate(source, scale, seed)
+        with tempfile.TemporaryDirectory() as workdir:
+            ctx = Context(df, workdir, artifacts_dir)
+            synthetic.write_csv(df, ctx.csv_path)  # fuera de la medición
+            for name, func in STEPS:
+                if steps and name not in steps and not name.startswith(('load_csv', 'build_')):
+                    continue
+                seconds, peak, result = measure(func, ctx, memory)
+                registro = {
+                    'scale': scale,
+                    'step': name,
+                    'seconds': round(seconds, 6),
+                    'peak_mb': None if peak is None else round(peak, 3),
+                }
+                if result is None and name == 'model_scoring':
+                    registro['skipped'] = f"sin modelos en {artifacts_dir}"
+                resultados.append(registro)
+                memoria = '' if peak is None else f"{peak:10.1f} MB"
+                log(f"{scale:>12,} {name:<20} {seconds:10.4f} s  {memoria}{'  (omitido)' if 'skipped' in registro else ''}")
+        del df, ctx
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES)
+    parser.add_argument('--steps', nargs='+', help='sólo estos pasos (la carga y el almacén siempre corren)')
+    parser.add_argument('--artifacts', default=str(models.ARTIFACTS_DIR))
+    parser.add_argument('--no-memory', action='store_true', help='no medir memoria (tracemalloc agrega overhead)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='benchmark_results.json')
+    args = parser.parse_args(argv)
+
+    resultados = run(args.scales, args.steps, args.artifacts, not args.no_memory, args.seed)
+    reporte = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'results': resultados,
+    }
+    Path(args.out).write_text(json.dumps(reporte, indent=2), encoding='utf-8')
+    print(f"Resultados escritos en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Índice de bitmaps para los filtros del sidebar.
+
+Por cada categoría de ``Linea``, ``Sistema``, ``Cat`` y ``Veh`` se guarda un
+bitmap empaquetado (1 bit por fila) y para ``year`` un índice de posiciones
+ordenadas por año con sus offsets. Filtrar es entonces unir e intersectar
+bitmaps y el resultado es una selección de posiciones de fila; las columnas
+se recogen después, sólo cuando un gráfico las lee.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+INDEXED_COLS = ('Linea', 'Sistema', 'Cat', 'Veh')
+
+
+def _positions_to_bitmap(positions, n):
+    bits = np.zeros(n, dtype=bool)
+    bits[positions] = True
+    return np.packbits(bits)
+
+
+def _extend_bitmap(bitmap, n, new_bits):
+    """Agrega ``new_bits`` a un bitmap de ``n`` bits sin desempaquetarlo completo."""
+    keep = n // 8
+    tail = np.unpackbits(bitmap[keep:], count=n - keep * 8).astype(bool)
+    return np.concatenate([bitmap[:keep], np.packbits(np.concatenate([tail, new_bits]))])
+
+
+class BitmapIndex:
+    """Bitmaps por categoría + índice ordenado por año sobre las filas de ``df``."""
+
+    def __init__(self, df):
+        self.n = len(df)
+        self.bitmaps = {}
+        for col in INDEXED_COLS:
+            codes = df[col].cat.codes.to_numpy()
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(df[col].cat.categories) + 1))
+            self.bitmaps[col] = {
+                valor: _positions_to_bitmap(order[bounds[i]:bounds[i + 1]], self.n)
+                for i, valor in enumerate(df[col].cat.categories)
+            }
+
+        # Índice de años: posiciones ordenadas por año y offset de inicio de cada año
+        years = df['year'].to_numpy()
+        self.year_order = np.argsort(years, kind='stable').astype(np.int32)
+        self.years, self.year_offsets = np.unique(years[self.year_order], return_index=True)
+        self.year_offsets = np.append(self.year_offsets, self.n)
+
+    def extended(self, delta):
+        """Nuevo índice con las filas de ``delta`` agregadas al final.
+
+        Sólo se calculan los bits de las filas nuevas; el índice original no
+        se modifica (las sesiones que lo están leyendo no ven estados a medias).
+        """
+        new = copy.copy(self)
+        new.n = self.n + len(delta)
+        new.bitmaps = {}
+        for col in INDEXED_COLS:
+            codes = delta[col].cat.codes.to_numpy()
+            bitmaps = dict(self.bitmaps[col])
+            for i, valor in enumerate(delta[col].cat.categories):
+                bm = bitmaps.get(valor)
+                if bm is None:
+                    bm = np.zeros((self.n + 7) // 8, dtype=np.uint8)
+                bitmaps[valor] = _extend_bitmap(bm, self.n, codes == i)
+            new.bitmaps[col] = bitmaps
+
+        # Se mezclan dos corridas ya ordenadas por año (la vieja y la del delta)
+        years = delta['year'].to_numpy()
+        order = np.argsort(years, kind='stable')
+        keys = np.concatenate([np.repeat(self.years, np.diff(self.year_offsets)), years[order]])
+        merge = np.argsort(keys, kind='stable')
+        new.year_order = np.concatenate([self.year_order, self.n + order])[merge].astype(np.int32)
+        new.years, offsets = np.unique(keys[merge], return_index=True)
+        new.year_offsets = np.append(offsets, new.n)
+        return new
+
+    def _union(self, col, valores):
+        """Bitmap de las filas cuyo ``col`` está en ``valores``, o None si son todas."""
+        bitmaps = self.bitmaps[col]
+        elegidos = set(valores)
+        if elegidos.issuperset(bitmaps):
+            return None
+
+        # Se une el lado más pequeño: si se eligió más de la mitad, se niega el resto
+        restantes = [bm for valor, bm in bitmaps.items() if valor not in elegidos]
+        seleccion = [bitmaps[valor] for valor in elegidos if valor in bitmaps]
+        if len(restantes) < len(seleccion):
+            return ~np.bitwise_or.reduce(restantes)
+        if not seleccion:
+            return np.zeros((self.n + 7) // 8, dtype=np.uint8)
+        return np.bitwise_or.reduce(seleccion)
+
+    def _year_range(self, anio_min, anio_max):
+        """Bitmap de las filas con ``anio_min <= year <= anio_max``, o None si son todas."""
+        start = np.searchsorted(self.years, anio_min, side='left')
+        stop = np.searchsorted(self.years, anio_max, side='right')
+        if start == 0 and stop == len(self.years):
+            return None
+        positions = self.year_order[self.year_offsets[start]:self.year_offsets[stop]]
+        return _positions_to_bitmap(positions, self.n)
+
+    def select(self, lineas, sistemas, categorias, vehiculos, anios):
+        """Posiciones (ordenadas) de las filas que cumplen todos los filtros."""
+        mask = None
+        bitmaps = [
+            self._union('Linea', lineas),
+            self._union('Sistema', sistemas),
+            self._union('Cat', categorias),
+            self._union('Veh', vehiculos),
+            self._year_range(anios[0], anios[1]),
+        ]
+        for bm in bitmaps:
+            if bm is not None:
+                mask = bm if mask is None else mask & bm
+
+        if mask is None:
+            return np.arange(self.n)
+        return np.flatnonzero(np.unpackbits(mask, count=self.n))
+
+
+class Selection:
+    """Vista perezosa de las filas ``positions`` de ``df``.
+
+    Las columnas se recogen (``take``) la primera vez que se piden y se
+    reutilizan en el resto del rerun.
+    """
+
+    def __init__(self, df, positions):
+        self.df = df
+        self.positions = positions
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def columns(self):
+        return self.df.columns
+
+    @property
+    def dtypes(self):
+        return self.df.dtypes
+
+    def column(self, col):
+        if col not in self._columns:
+            self._columns[col] = self.df[col].take(self.positions)
+        return self._columns[col]
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+        return pd.DataFrame({col: self.column(col) for col in key})
+
+    def frame(self):
+        """Todas las columnas de la selección como DataFrame."""
+        return self[list(self.df.columns)]
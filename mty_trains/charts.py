@@ -0,0 +1,90 @@
+"""Construcción en paralelo de los gráficos de una vista.
+
+Las vistas de distribución, retrasos y desalojos arman tres o cuatro figuras
+independientes (agregado, orden, ``px.bar`` y serialización). ``ChartBatch``
+manda cada figura a un pool de hilos compartido en cuanto la vista la
+registra, y entrega los resultados en el orden de registro para que el
+script los dibuje: las llamadas a Streamlit se quedan en el hilo del script.
+
+Cada tarea anota sus aciertos/fallos de caché en un perfil propio que luego
+se une al del rerun. Con el perfil activo, cada gráfico queda como sección
+``gráfico: <nombre>`` (tiempo en su hilo) y el lote como
+``gráficos en paralelo`` con el tiempo de pared y la suma secuencial.
+
+``MTY_GRAFICOS_HILOS`` fija el tamaño del pool (1 = en el hilo del script,
+como antes).
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from mty_trains import profiling
+
+WORKERS = int(os.environ.get("MTY_GRAFICOS_HILOS", min(4, os.cpu_count() or 1)))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="graficos")
+        return _pool
+
+
+def _timed(build):
+    start = time.perf_counter()
+    result = build()
+    return result, (time.perf_counter() - start) * 1000
+
+
+class ChartBatch:
+    """Figuras de una vista: se construyen al registrarlas y se entregan en orden."""
+
+    def __init__(self, parallel=True, setup=None):
+        self.profile = profiling.current()
+        self.parallel = parallel and WORKERS > 1
+        # ``setup`` corre en el hilo auxiliar antes de cada tarea (p. ej. adjuntar el contexto del script)
+        self.setup = setup
+        self._jobs = []
+        self._start = time.perf_counter()
+
+    def _run_in_thread(self, build):
+        if self.setup is not None:
+            self.setup()
+        task_profile = profiling.start_rerun(self.profile.enabled, self.profile.session_id)
+        return (*_timed(build), task_profile)
+
+    def add(self, name, build, target=None):
+        """Registra ``build`` (función sin argumentos); ``target`` viaja con el resultado."""
+        if self.parallel:
+            job = _executor().submit(self._run_in_thread, build)
+        else:
+            job = (*_timed(build), None)
+        self._jobs.append((name, target, job))
+
+    def results(self):
+        """(nombre, target, resultado) en el orden de ``add``, esperando a cada uno."""
+        total_ms = 0.0
+        for name, target, job in self._jobs:
+            result, ms, task_profile = job.result() if isinstance(job, Future) else job
+            if task_profile is not None:
+                self.profile.merge(task_profile)
+            if self.profile.enabled:
+                self.profile.sections.append({'section': f"gráfico: {name}", 'rows': None, 'ms': round(ms, 3)})
+            total_ms += ms
+            yield name, target, result
+
+        if self.profile.enabled and self._jobs:
+            wall_ms = (time.perf_counter() - self._start) * 1000
+            self.profile.sections.append({
+                'section': "gráficos en paralelo" if self.parallel else "gráficos",
+                'rows': len(self._jobs),
+                'ms': round(wall_ms, 3),
+                'secuencial_ms': round(total_ms, 3),
+                'hilos': WORKERS if self.parallel else 1,
+            })
+        self._jobs = []
@@ -0,0 +1,250 @@
+"""Cubos de agregados de fallas.
+
+Cada cubo agrega las filas a las combinaciones observadas de sus llaves con el
+conteo de fallas y la suma de ``Retraso_minutos``. Hay uno por familia de
+gráficos (``CUBES``): las barras por línea/sistema/categoría/tren/año y las
+tendencias por línea/año/periodo. Una consulta usa el cubo más chico que tenga
+sus columnas de agrupación y las de los filtros que sí restringen algo. Si
+ninguno sirve, o el cubo no tiene al menos ``MIN_REDUCTION`` veces menos
+celdas que filas el dataset (con pocos incidentes por combinación, agregar las
+celdas cuesta lo mismo que agrupar las filas), se agrupan las filas
+seleccionadas.
+
+Las celdas de cada cubo van ordenadas por una llave entera (los códigos de
+sus columnas empacados en bits). Un delta busca sus celdas con
+``searchsorted``: las existentes suman sus medidas y las nuevas se insertan en
+su lugar, sin volver a agrupar el cubo.
+"""
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+CUBES = {
+    'barras': ['Linea', 'Sistema', 'Cat', 'Veh', 'year', 'Causó_desalojo'],
+    'semanas': ['Linea', 'year', 'periodo_semana'],
+    'meses': ['Linea', 'year', 'periodo_mes'],
+}
+
+# Columnas de los filtros del sidebar, en el orden de ``filtros``
+FILTER_KEYS = ['Linea', 'Sistema', 'Cat', 'Veh', 'year']
+
+MEASURES = ['conteo', 'retraso_suma', 'retraso_n']
+
+MIN_REDUCTION = 4
+
+
+def build_cube(df, keys):
+    """Agrega ``df`` a nivel de celda de ``keys``.
+
+    ``retraso_n`` cuenta los retrasos no nulos para que los promedios del
+    roll-up sean iguales a ``mean()`` sobre filas.
+    """
+    base = df[keys].assign(
+        # Las sumas se acumulan en float64 aunque el dataset esté en modo compacto
+        Retraso_minutos=df['Retraso_minutos'].astype('float64'),
+    )
+    return (
+        base.groupby(keys, observed=True, dropna=False)
+        .agg(
+            conteo=('Retraso_minutos', 'size'),
+            retraso_suma=('Retraso_minutos', 'sum'),
+            retraso_n=('Retraso_minutos', 'count'),
+        )
+        .reset_index()
+    )
+
+
+def merge_cubes(cube, delta_cube, keys):
+    """Suma las celdas de ``delta_cube`` al cubo.
+
+    Ambos cubos deben compartir las categorías de sus columnas categóricas.
+    """
+    return (
+        pd.concat([cube, delta_cube], ignore_index=True)
+        .groupby(keys, observed=True, dropna=False)[MEASURES]
+        .sum()
+        .reset_index()
+    )
+
+
+def _raw(series):
+    """Enteros de una columna de llave y su máscara de nulos."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy().astype(np.int64)
+        return codes, codes < 0
+    null = series.isna().to_numpy()
+    values = series.to_numpy()
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype('datetime64[D]')
+    return np.where(null, 0, values.astype(np.int64)), null
+
+
+def _layout(cells, keys):
+    """(columna, base, bits) de cada llave, con margen para códigos nuevos; ``None`` si no caben en 62 bits."""
+    layout = []
+    for col in keys:
+        raw, null = _raw(cells[col])
+        base = 0 if isinstance(cells[col].dtype, pd.CategoricalDtype) or null.all() else int(raw[~null].min())
+        top = int(raw[~null].max()) - base + 1 if (~null).any() else 0
+        # El doble del código más alto: caben categorías, años y periodos nuevos
+        layout.append((col, base, max(1, (2 * top + 1).bit_length())))
+    return layout if sum(bits for _, _, bits in layout) <= 62 else None
+
+
+def _pack(cells, layout):
+    """Llave entera de cada celda (0 = nulo en cada columna); ``None`` si algún código no cabe."""
+    packed = np.zeros(len(cells), dtype=np.int64)
+    shift = 0
+    # La primera llave queda en los bits altos: el orden de la llave es el de las columnas
+    for col, base, bits in reversed(layout):
+        raw, null = _raw(cells[col])
+        code = np.where(null, 0, raw - base + 1)
+        if len(code) and (code.min() < 0 or code.max() >= 1 << bits):
+            return None
+        packed |= code << shift
+        shift += bits
+    return packed
+
+
+def _indexed(cells, keys):
+    """Celdas ordenadas por su llave empacada: (celdas, llaves, layout)."""
+    layout = _layout(cells, keys)
+    if layout is None:
+        return cells, None, None
+    packed = _pack(cells, layout)
+    order = np.argsort(packed, kind='stable')
+    return cells.take(order).reset_index(drop=True), packed[order], layout
+
+
+def _column(old, at, new):
+    """Columna ``old`` con los valores de ``new`` insertados antes de las posiciones ``at``."""
+    if isinstance(new.dtype, pd.CategoricalDtype):
+        # Las categorías nuevas van al final: los códigos existentes siguen valiendo
+        codes = np.insert(old.cat.codes.to_numpy(), at, new.cat.codes.to_numpy())
+        return pd.Categorical.from_codes(codes, dtype=new.dtype)
+    return np.insert(old.to_numpy(), at, new.to_numpy())
+
+
+def merge_indexed(cells, packed, layout, delta_cells, keys):
+    """Suma ``delta_cells`` a un cubo ordenado; costo ∝ celdas del delta (más copiar los arreglos).
+
+    Si el delta trae códigos fuera del margen del layout, se vuelve a agrupar
+    y ordenar el cubo completo.
+    """
+    delta_packed = None if layout is None else _pack(delta_cells, layout)
+    if delta_packed is None:
+        cells = cells.copy(deep=False)
+        for col in keys:
+            if isinstance(delta_cells[col].dtype, pd.CategoricalDtype):
+                cells[col] = cells[col].cat.set_categories(delta_cells[col].cat.categories)
+        return _indexed(merge_cubes(cells, delta_cells, keys), keys)
+
+    at = np.searchsorted(packed, delta_packed)
+    found = at < len(packed)
+    found[found] = packed[at[found]] == delta_packed[found]
+
+    merged = {}
+    for col in MEASURES:
+        values = cells[col].to_numpy().copy()
+        values[at[found]] += delta_cells[col].to_numpy()[found]
+        merged[col] = values
+
+    # Celdas nuevas: en orden de llave, cada una antes de la primera llave mayor
+    fresh = np.flatnonzero(~found)
+    fresh = fresh[np.argsort(delta_packed[fresh], kind='stable')]
+    new_cells = delta_cells.take(fresh)
+    columns = {col: _column(cells[col], at[fresh], new_cells[col]) for col in keys}
+    for col in MEASURES:
+        columns[col] = np.insert(merged[col], at[fresh], new_cells[col].to_numpy())
+    return pd.DataFrame(columns), np.insert(packed, at[fresh], delta_packed[fresh]), layout
+
+
+class CubeSet:
+    """Los cubos de ``CUBES`` de un dataset de ``n_rows`` filas; inmutable."""
+
+    def __init__(self, df, _cubes=None):
+        if _cubes is None:
+            _cubes = {name: _indexed(build_cube(df, keys), keys) for name, keys in CUBES.items()}
+        self.cubes = {name: cells for name, (cells, _, _) in _cubes.items()}
+        self._keys = {name: (packed, layout) for name, (_, packed, layout) in _cubes.items()}
+        self.n_rows = len(df)
+
+    def __getitem__(self, name):
+        return self.cubes[name]
+
+    def extended(self, df, delta):
+        """Cubos de ``df`` (el dataset ya con ``delta`` al final, categorías alineadas)."""
+        cubes = {}
+        for name, keys in CUBES.items():
+            cubes[name] = merge_indexed(self.cubes[name], *self._keys[name], build_cube(delta, keys), keys)
+        return CubeSet(df, cubes)
+
+    @cached_property
+    def _observed(self):
+        # Valores presentes por columna de filtro: el cubo de barras tiene todas
+        barras = self.cubes['barras']
+        observed = {col: set(barras[col].dropna().unique()) for col in FILTER_KEYS if col != 'year'}
+        observed['year'] = (barras['year'].min(), barras['year'].max())
+        return observed
+
+    def restricted(self, filtros):
+        """Columnas de filtro que dejan fuera algún valor presente en el dataset."""
+        observed = self._observed
+        columns = {
+            col for col, selected in zip(FILTER_KEYS[:-1], filtros)
+            if not observed[col] <= set(selected)
+        }
+        anios = filtros[len(FILTER_KEYS) - 1]
+        if anios[0] > observed['year'][0] or anios[1] < observed['year'][1]:
+            columns.add('year')
+        return columns
+
+    def choose(self, filtros, by, solo_desalojos=False):
+        """Nombre del cubo más chico que responde la consulta, o ``None`` para agrupar filas."""
+        if filtros[-1]:
+            # El cubo no distingue textos: las búsquedas se agrupan sobre las filas encontradas
+            return None
+        needed = set(by) | self.restricted(filtros) | ({'Causó_desalojo'} if solo_desalojos else set())
+        usable = [
+            name for name, keys in CUBES.items()
+            if needed <= set(keys) and len(self.cubes[name]) * MIN_REDUCTION <= self.n_rows
+        ]
+        return min(usable, key=lambda name: len(self.cubes[name]), default=None)
+
+
+def filter_cube(cube, lineas, sistemas, categorias, vehiculos, anios):
+    """Celdas del cubo que cumplen los filtros del sidebar (sólo los de sus columnas)."""
+    mask = pd.Series(True, index=cube.index)
+    for col, selected in zip(FILTER_KEYS[:-1], (lineas, sistemas, categorias, vehiculos)):
+        if col in cube.columns:
+            mask &= cube[col].isin(selected)
+    return cube[mask & cube['year'].between(anios[0], anios[1])]
+
+
+def rollup(cube, by):
+    """Agrega las celdas por ``by``: ``conteo``, ``retraso_suma`` y ``retraso_promedio``."""
+    grouped = cube.groupby(by, observed=True)[MEASURES].sum()
+    grouped['retraso_promedio'] = grouped['retraso_suma'] / grouped['retraso_n'].where(grouped['retraso_n'] > 0)
+    return grouped.drop(columns='retraso_n').reset_index()
+
+
+def rollup_rows(df, positions, by, solo_desalojos=False):
+    """Mismo resultado que ``rollup`` agrupando directamente las filas ``positions``."""
+    by = list(by)
+    columns = list(dict.fromkeys(by + (['Causó_desalojo'] if solo_desalojos else [])))
+    rows = df[columns].take(positions)
+    retraso = df['Retraso_minutos'].take(positions).astype('float64')
+    if solo_desalojos:
+        mask = (rows['Causó_desalojo'] == 1).to_numpy()
+        rows, retraso = rows[mask], retraso[mask]
+    grouped = retraso.groupby([rows[col] for col in by], observed=True).agg(
+        conteo='size', retraso_suma='sum', retraso_n='count'
+    )
+    grouped['retraso_promedio'] = grouped['retraso_suma'] / grouped['retraso_n'].where(grouped['retraso_n'] > 0)
+    return grouped.drop(columns='retraso_n').reset_index()
+
+
+def desalojos(cube):
+    """Celdas de fallas que causaron desalojo."""
+    return cube[cube['Causó_desalojo'] == 1]
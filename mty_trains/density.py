@@ -0,0 +1,87 @@
+"""Modo agregado para el scatter "% de desalojo vs minutos de retraso".
+
+Con muchas filas, en lugar de un marcador por incidente y un OLS de
+statsmodels por línea, se agrupan los puntos en una malla 2-D por línea y la
+recta de tendencia se ajusta en forma cerrada a partir de sumas
+(n, Σx, Σy, Σx², Σxy) calculadas con ``np.bincount``.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# Por encima de este número de filas el scatter pasa al modo agregado
+SCATTER_MAX_POINTS = int(os.environ.get("MTY_SCATTER_MAX_PUNTOS", 20000))
+
+BINS = 40
+
+
+def _valid(x, y):
+    return ~(np.isnan(x) | np.isnan(y))
+
+
+def line_fits(df, x, y, group):
+    """Recta de mínimos cuadrados ``y = intercepto + pendiente·x`` por ``group``."""
+    xv = df[x].to_numpy(dtype=float)
+    yv = df[y].to_numpy(dtype=float)
+    codes = df[group].cat.codes.to_numpy()
+    ok = _valid(xv, yv) & (codes >= 0)
+    xv, yv, codes = xv[ok], yv[ok], codes[ok]
+
+    k = len(df[group].cat.categories)
+    n = np.bincount(codes, minlength=k)
+    sx = np.bincount(codes, weights=xv, minlength=k)
+    sy = np.bincount(codes, weights=yv, minlength=k)
+    sxx = np.bincount(codes, weights=xv * xv, minlength=k)
+    sxy = np.bincount(codes, weights=xv * yv, minlength=k)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pendiente = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        intercepto = (sy - pendiente * sx) / n
+
+    fits = pd.DataFrame({
+        group: df[group].cat.categories,
+        'n': n,
+        'pendiente': pendiente,
+        'intercepto': intercepto,
+        'x_min': pd.Series(xv).groupby(codes).min().reindex(range(k)).to_numpy(),
+        'x_max': pd.Series(xv).groupby(codes).max().reindex(range(k)).to_numpy(),
+    })
+    return fits[np.isfinite(fits['pendiente'])].reset_index(drop=True)
+
+
+def _edges(values, bins):
+    lo, hi = (float(values.min()), float(values.max())) if len(values) else (0.0, 1.0)
+    if hi <= lo:
+        hi = lo + 1.0
+    return lo, (hi - lo) / bins
+
+
+def bin_points(df, x, y, group, bins=BINS):
+    """Cuenta los puntos por celda de una malla ``bins``×``bins`` y por ``group``.
+
+    Devuelve una fila por celda no vacía con el centro de la celda, el
+    conteo y el promedio de ``y`` (útil para el hover).
+    """
+    xv = df[x].to_numpy(dtype=float)
+    yv = df[y].to_numpy(dtype=float)
+    codes = df[group].cat.codes.to_numpy()
+    ok = _valid(xv, yv) & (codes >= 0)
+    xv, yv, codes = xv[ok], yv[ok], codes[ok]
+
+    x0, dx = _edges(xv, bins)
+    y0, dy = _edges(yv, bins)
+    ix = np.minimum(((xv - x0) / dx).astype(np.int64), bins - 1)
+    iy = np.minimum(((yv - y0) / dy).astype(np.int64), bins - 1)
+
+    keys = (codes.astype(np.int64) * bins + ix) * bins + iy
+    celdas, inverse, conteo = np.unique(keys, return_inverse=True, return_counts=True)
+    y_prom = np.bincount(inverse, weights=yv) / conteo
+
+    return pd.DataFrame({
+        group: pd.Categorical.from_codes(celdas // (bins * bins), dtype=df[group].dtype),
+        x: x0 + ((celdas // bins) % bins + 0.5) * dx,
+        y: y0 + (celdas % bins + 0.5) * dy,
+        'conteo': conteo,
+        'y_promedio': y_prom,
+    })
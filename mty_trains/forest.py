@@ -0,0 +1,176 @@
+"""Exportación compacta de los pipelines de random forest.
+
+Un pipeline ``ColumnTransformer(OneHotEncoder + passthrough) -> RandomForest*``
+se guarda como un directorio ``<modelo>.forest/`` con los nodos de todos los
+árboles en arreglos planos ``.npy`` (feature, threshold, hijos, valor por
+nodo, raíz de cada árbol) y un ``meta.json`` con las categorías del encoder.
+Las hojas apuntan a sí mismas (umbral ``+inf``), así que recorrer un nivel
+más desde una hoja no la mueve.
+Cargar es abrir los arreglos con ``mmap_mode='r'``: no hay unpickling ni
+objetos por árbol, y varios procesos comparten las mismas páginas.
+
+``CompactForest`` expone ``predict``/``predict_proba``/``classes_`` como el
+pipeline original, así que ``models.score`` funciona con cualquiera de los dos.
+Las predicciones coinciden con las de scikit-learn: la entrada se convierte a
+float32 y se compara contra los umbrales en float64, como en los árboles.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SUFFIX = ".forest"
+_ARRAYS = ('feature', 'threshold', 'children', 'value', 'roots')
+# Filas por bloque al recorrer el bosque: acota la memoria de los pares (fila, árbol)
+BLOCK_ROWS = 2048
+# Niveles recorridos entre cada descarte de los pares que ya llegaron a una hoja
+_STEPS = 4
+
+
+def compact_path(pickle_path):
+    return Path(pickle_path).with_suffix(SUFFIX)
+
+
+def _passthrough(transformer):
+    # El ``remainder='passthrough'`` ajustado queda como FunctionTransformer identidad
+    return transformer == 'passthrough' or (
+        type(transformer).__name__ == 'FunctionTransformer' and transformer.func is None
+    )
+
+
+def _layout(preprocessor, features):
+    """Columnas de la matriz transformada: (columna de entrada, categoría o None)."""
+    features = list(getattr(preprocessor, 'feature_names_in_', features))
+    layout = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if isinstance(transformer, str) and transformer == 'drop' or len(columns) == 0:
+            continue
+        columns = [features[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+        if _passthrough(transformer):
+            layout.extend((col, None) for col in columns)
+        elif hasattr(transformer, 'categories_'):
+            for col, categories in zip(columns, transformer.categories_):
+                layout.extend((col, value) for value in categories.tolist())
+        else:
+            raise ValueError(f"Transformador no soportado para la exportación compacta: {name}")
+    return layout
+
+
+def export(pipeline, path, features, source_checksum=None):
+    """Escribe ``pipeline`` (preprocesador + bosque) en el directorio ``path``."""
+    preprocessor, forest = pipeline[0], pipeline[-1]
+    trees = [estimator.tree_ for estimator in forest.estimators_]
+    classifier = hasattr(forest, 'classes_')
+
+    # Los índices de hijos pasan de locales a cada árbol a globales; las hojas, a sí mismas
+    offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+    children = []
+    for tree, offset in zip(trees, offsets):
+        local = np.stack([tree.children_left, tree.children_right], axis=1)
+        own = np.arange(tree.node_count)[:, None]
+        children.append(np.where(local >= 0, local, own) + offset)
+    feature = np.concatenate([tree.feature for tree in trees])
+    leaf = feature < 0
+    value = np.concatenate([tree.value[:, 0, :] for tree in trees]).astype(np.float64)
+    if classifier:
+        # Probabilidad por hoja, como ``DecisionTreeClassifier.predict_proba``
+        value /= np.maximum(value.sum(axis=1, keepdims=True), np.finfo(np.float64).tiny)
+    arrays = {
+        'feature': np.where(leaf, 0, feature).astype(np.int32),
+        'threshold': np.where(leaf, np.inf, np.concatenate([tree.threshold for tree in trees])),
+        'children': np.concatenate(children).astype(np.int32),
+        'value': value,
+        'roots': offsets[:-1].astype(np.int64),
+    }
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    for name in _ARRAYS:
+        np.save(path / f"{name}.npy", arrays[name])
+    meta = {
+        'features': list(features),
+        'layout': _layout(preprocessor, list(features)),
+        'classes': forest.classes_.tolist() if classifier else None,
+        'max_depth': int(max(tree.max_depth for tree in trees)),
+        'source_checksum': source_checksum,
+    }
+    (path / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def size_bytes(path):
+    return sum(f.stat().st_size for f in Path(path).iterdir())
+
+
+class CompactForest:
+    """Bosque cargado desde ``export``; los arreglos quedan mapeados en memoria."""
+
+    def __init__(self, path, mmap=True):
+        path = Path(path)
+        self.meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        for name in _ARRAYS:
+            setattr(self, name, np.load(path / f"{name}.npy", mmap_mode='r' if mmap else None))
+        self._next = np.asarray(self.children).ravel()
+        self._leaf = self.children[:, 0] == np.arange(len(self.children))
+        self.classes_ = None if self.meta['classes'] is None else np.array(self.meta['classes'])
+
+        # Columna de la matriz transformada por (columna de entrada, categoría)
+        self._numeric = []
+        self._onehot = {}
+        for j, (col, category) in enumerate(self.meta['layout']):
+            if category is None:
+                self._numeric.append((j, col))
+            else:
+                self._onehot.setdefault(col, ([], []))
+                self._onehot[col][0].append(category)
+                self._onehot[col][1].append(j)
+
+    def transform(self, X):
+        """Matriz densa float32 equivalente a la salida del ``ColumnTransformer``."""
+        n = len(X)
+        Xt = np.zeros((n, len(self.meta['layout'])), dtype=np.float32)
+        for j, col in self._numeric:
+            Xt[:, j] = pd.to_numeric(X[col]).to_numpy(dtype=np.float32)
+        rows = np.arange(n)
+        for col, (categories, columns) in self._onehot.items():
+            # Categorías desconocidas quedan en cero (handle_unknown='ignore')
+            codes = pd.Categorical(np.asarray(X[col], dtype=object), categories=categories).codes
+            known = codes >= 0
+            Xt[rows[known], np.asarray(columns)[codes[known]]] = 1.0
+        return Xt
+
+    def _leaf_nodes(self, Xt):
+        """Hoja a la que llega cada par (fila, árbol), en orden fila por fila."""
+        n_trees, n_cols = len(self.roots), Xt.shape[1]
+        node = np.tile(np.asarray(self.roots, dtype=np.int32), len(Xt))
+        pair = np.arange(len(node))
+        offset = np.repeat(np.arange(len(Xt)) * n_cols, n_trees)
+        values = Xt.ravel()
+        current = node.copy()
+        while len(pair):
+            for _ in range(_STEPS):
+                go_right = values[offset + self.feature[current]] > self.threshold[current]
+                current = self._next[current * 2 + go_right]
+            # Sólo siguen los pares que aún no llegan a una hoja
+            node[pair] = current
+            pending = ~self._leaf[current]
+            pair, current, offset = pair[pending], current[pending], offset[pending]
+        return node
+
+    def _leaf_values(self, X):
+        """Valor de la hoja de cada (fila, árbol): arreglo (filas, árboles, salidas)."""
+        Xt = self.transform(X)
+        node = np.concatenate([
+            self._leaf_nodes(Xt[start:start + BLOCK_ROWS]) for start in range(0, len(Xt), BLOCK_ROWS)
+        ]) if len(Xt) else np.empty(0, dtype=np.int32)
+        return self.value[node].reshape(len(Xt), len(self.roots), -1)
+
+    def predict_proba(self, X):
+        return self._leaf_values(X).mean(axis=1, dtype=np.float64)
+
+    def predict(self, X):
+        values = self._leaf_values(X).mean(axis=1, dtype=np.float64)
+        if self.classes_ is not None:
+            return self.classes_[values.argmax(axis=1)]
+        return values[:, 0]
@@ -0,0 +1,153 @@
+"""Ingesta incremental de nuevos registros de fallas.
+
+Los archivos delta (CSV ``;``-delimitado o Excel con las mismas columnas que
+``02_data_for_ML.csv``) se dejan en ``data/incoming/``. Cada uno se valida, se
+tipa igual que el dataset y se guarda como Arrow en ``data/deltas/``; el
+original se mueve a ``procesados/`` (o a ``rechazados/`` con un ``.error.txt``
+si no pasa la validación). ``FailureStore.sync`` aplica después los deltas
+guardados sobre el estado en memoria; si existe ``data/particiones/``, el
+delta también se escribe ahí para el backend ``arrow`` (y se compactan las
+particiones que toca).
+
+Uso desde la raíz del repo (el tablero hace lo mismo en cada rerun)::
+
+    python -m mty_trains.ingest
+"""
+import shutil
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+
+from mty_trains import backend, snapshot
+
+INCOMING_DIR = Path("./data/incoming")
+DELTAS_DIR = Path("./data/deltas")
+
+DELTA_SUFFIXES = ('.csv', '.xlsx', '.xls')
+
+# Varias sesiones del tablero revisan el directorio a la vez
+_lock = threading.Lock()
+
+
+def read_delta(path):
+    """Lee un archivo delta tal cual (sin tipar)."""
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        return pd.read_csv(path, sep=';', encoding='utf-8')
+    return pd.read_excel(path)
+
+
+def _as_text(value):
+    if isinstance(value, str):
+        return value
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def validate_delta(raw, reference):
+    """Devuelve ``raw`` con las columnas y tipos de ``reference``.
+
+    Las columnas derivadas (``snapshot.DERIVED_COLS``) se calculan aquí, no se
+    esperan en el archivo.
+
+    Lanza ``ValueError`` si faltan columnas o hay valores que no se pueden
+    convertir al tipo del dataset.
+    """
+    if raw.empty:
+        raise ValueError("El archivo no tiene filas.")
+    columns = [col for col in reference.columns if col not in snapshot.DERIVED_COLS]
+    missing = [col for col in columns if col not in raw.columns]
+    if missing:
+        raise ValueError(f"Faltan columnas: {', '.join(missing)}")
+
+    delta = pd.DataFrame(index=pd.RangeIndex(len(raw)))
+    errores = []
+    for col in columns:
+        dtype = reference[col].dtype
+        values = raw[col]
+        if isinstance(dtype, pd.CategoricalDtype):
+            target = dtype.categories.dtype
+            if is_numeric_dtype(target):
+                converted = pd.to_numeric(values, errors='coerce')
+            else:
+                # Códigos que el lector tomó como números (Supervisor_reviso 740 -> "740")
+                converted = values.map(_as_text, na_action='ignore')
+        elif is_datetime64_any_dtype(dtype):
+            converted = pd.to_datetime(values, errors='coerce')
+        elif is_numeric_dtype(dtype):
+            converted = pd.to_numeric(values, errors='coerce')
+        else:
+            delta[col] = values.astype(dtype)
+            continue
+
+        invalid = converted.isna() & values.notna()
+        if invalid.any():
+            filas = ', '.join(str(i + 2) for i in invalid[invalid].index[:5])
+            errores.append(f"{col}: valores no válidos (filas {filas})")
+            continue
+
+        if isinstance(dtype, pd.CategoricalDtype):
+            # Mismo tipo de categorías que el dataset (p. ej. Veh entero aunque Excel lo lea como float)
+            if converted.notna().all():
+                converted = converted.astype(target)
+            delta[col] = converted.astype('category')
+        elif is_datetime64_any_dtype(dtype):
+            delta[col] = converted
+        else:
+            try:
+                delta[col] = converted.astype(dtype)
+            except (TypeError, ValueError):
+                errores.append(f"{col}: hay valores vacíos en una columna {dtype}")
+
+    if errores:
+        raise ValueError("; ".join(errores))
+    return snapshot.add_derived(delta)
+
+
+def pending_files(incoming_dir=INCOMING_DIR):
+    if not incoming_dir.is_dir():
+        return []
+    return sorted(p for p in incoming_dir.iterdir() if p.is_file() and p.suffix.lower() in DELTA_SUFFIXES)
+
+
+def process_incoming(reference, incoming_dir=INCOMING_DIR, deltas_dir=DELTAS_DIR):
+    """Valida y guarda los archivos pendientes de ``incoming_dir``.
+
+    Devuelve una lista ``(nombre, filas | mensaje de error)`` por archivo.
+    """
+    with _lock:
+        return [_process_file(path, reference, incoming_dir, deltas_dir) for path in pending_files(incoming_dir)]
+
+
+def _process_file(path, reference, incoming_dir, deltas_dir):
+    try:
+        delta = validate_delta(read_delta(path), reference)
+    except (ValueError, ImportError, OSError) as e:
+        destino = incoming_dir / "rechazados"
+        destino.mkdir(exist_ok=True)
+        (destino / f"{path.name}.error.txt").write_text(str(e), encoding='utf-8')
+        shutil.move(str(path), str(destino / path.name))
+        return path.name, str(e)
+
+    # El prefijo de fecha-hora mantiene el orden de llegada de los deltas
+    deltas_dir.mkdir(parents=True, exist_ok=True)
+    nombre = f"{datetime.now():%Y%m%dT%H%M%S%f}_{path.stem}.arrow"
+    snapshot.write_snapshot(delta, snapshot.checksum(path), deltas_dir / nombre)
+    # Si existe el dataset particionado (backend arrow), el delta también se le agrega
+    if backend.PARTITIONS_DIR.is_dir():
+        backend.append_partitions(delta, backend.PARTITIONS_DIR, name=Path(nombre).stem)
+
+    destino = incoming_dir / "procesados"
+    destino.mkdir(exist_ok=True)
+    shutil.move(str(path), str(destino / path.name))
+    return path.name, len(delta)
+
+
+if __name__ == "__main__":
+    reference = snapshot.load_dataset()
+    for nombre, resultado in process_incoming(reference):
+        estado = f"{resultado} filas" if isinstance(resultado, int) else f"rechazado: {resultado}"
+        print(f"{nombre}: {estado}", file=sys.stdout if isinstance(resultado, int) else sys.stderr)
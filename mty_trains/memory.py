@@ -0,0 +1,156 @@
+"""Representación compacta del dataset en memoria.
+
+En modo compacto (por defecto; ``MTY_COMPACTO=0`` lo desactiva) las columnas
+numéricas se guardan con el tipo más chico que alcanza y los textos libres
+(``Descripcion``, ``Correccion``) como categorías con diccionario de strings de
+Arrow: cada fila guarda un código de 2 bytes en lugar de un objeto ``str``.
+
+``python -m mty_trains.memory`` compara la memoria residente de un worker con
+la carga original (CSV con tipos de 64 bits, copia por rerun de
+``st.cache_data`` y copia filtrada) contra la carga compacta compartida (el
+snapshot compacto y el almacén con sus índices).
+"""
+import argparse
+import ctypes
+import gc
+import multiprocessing
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+COMPACT = os.environ.get("MTY_COMPACTO", "1") != "0"
+
+DOWNCAST = {
+    'year': 'int16',
+    'month': 'int8',
+    'day': 'int8',
+    'Retraso_minutos': 'float32',
+    'Porcentaje_desalojo': 'float32',
+}
+
+TEXT_COLS = ['Descripcion', 'Correccion']
+
+
+def _fits(values, dtype):
+    if values.empty:
+        return True
+    info = np.iinfo(dtype) if np.issubdtype(np.dtype(dtype), np.integer) else np.finfo(dtype)
+    return info.min <= values.min() and values.max() <= info.max
+
+
+def compact(df):
+    """Reduce los tipos de ``df`` en su lugar y lo devuelve."""
+    for col, dtype in DOWNCAST.items():
+        if col in df.columns and _fits(df[col], dtype):
+            df[col] = df[col].astype(dtype)
+    for col in TEXT_COLS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            categories = pd.Index(pd.unique(df[col].dropna()), dtype='string[pyarrow]')
+            df[col] = pd.Categorical(df[col], categories=categories)
+    return df
+
+
+def frame_mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def _trimmed_rss():
+    """RSS tras devolver al sistema la memoria libre (pool de Arrow y malloc)."""
+    from mty_trains import profiling
+
+    import pyarrow as pa
+
+    gc.collect()
+    pa.default_memory_pool().release_unused()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+    return profiling.rss_mb()
+
+
+def _worker_rss(mode, csv_path):
+    """Corre en un proceso aparte: RSS antes y después de cargar como un worker."""
+    from mty_trains import bitmap, snapshot, store
+
+    # Arrow ya está cargado en la app en ambos modos (Streamlit serializa cada tabla
+    # como Arrow IPC); su costo fijo no cuenta
+    from streamlit import dataframe_util
+
+    dataframe_util.convert_pandas_df_to_arrow_bytes(
+        pd.DataFrame({'x': pd.Categorical(['x'], categories=pd.Index(['x'], dtype='string[pyarrow]'))})
+    )
+    rss_inicio = _trimmed_rss()
+    if mode == 'original':
+        df = snapshot.read_csv(csv_path, compact=False)
+    else:
+        # El camino de ``resources.load_data``: el snapshot compacto ya construido
+        df = snapshot.load_dataset(csv_path, compact=True)
+    rss_datos = _trimmed_rss() - rss_inicio
+
+    if mode == 'original':
+        # st.cache_data guarda el DataFrame serializado y cada rerun recibe una copia;
+        # el filtro con máscara booleana vuelve a copiar todas las columnas
+        guardado = pickle.dumps(df)
+        copia = pickle.loads(guardado)
+        filtrado = copia[copia['year'].between(copia['year'].min(), copia['year'].max())]
+        vivos = (df, guardado, copia, filtrado)
+    else:
+        almacen = store.FailureStore(df)
+        seleccion = bitmap.Selection(almacen.state.df, almacen.state.index.select(
+            *[list(df[col].cat.categories) for col in bitmap.INDEXED_COLS],
+            (int(df['year'].min()), int(df['year'].max())),
+        ))
+        vivos = (almacen, seleccion['Linea'])
+    rss_worker = _trimmed_rss() - rss_inicio
+    del vivos
+    return mode, len(df), frame_mb(df), rss_datos, rss_worker
+
+
+def report(rows=None):
+    """[(modo, filas, MB del DataFrame, MB residentes al cargar, MB residentes del worker)].
+
+    Con ``rows`` se escribe antes un CSV sintético en un directorio temporal.
+    El snapshot compacto se construye fuera de la medición (como en el paso de
+    build) y cada modo corre en un proceso nuevo para que la memoria de uno no
+    contamine la medición del otro.
+    """
+    from mty_trains import snapshot, synthetic
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = snapshot.CSV_PATH
+        if rows:
+            csv_path = Path(tmp) / "sintetico.csv"
+            synthetic.write_csv(synthetic.generate(snapshot.load_dataset(), rows), csv_path)
+        if snapshot.snapshot_checksum(snapshot.snapshot_path(csv_path), compact=True) != snapshot.checksum(csv_path):
+            snapshot.build_snapshot(csv_path, compact=True)
+
+        ctx = multiprocessing.get_context('spawn')
+        resultados = []
+        for mode in ('original', 'compacto'):
+            with ctx.Pool(1) as pool:
+                resultados.append(pool.apply(_worker_rss, (mode, csv_path)))
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memoria del dataset: carga original vs compacta.")
+    parser.add_argument('--rows', type=int, help='usar un dataset sintético de este tamaño')
+    args = parser.parse_args(argv)
+
+    resultados = report(args.rows)
+    print(f"{'modo':<9} {'filas':>12}  {'DataFrame MB':>13} {'carga RSS MB':>13} {'worker RSS MB':>14}")
+    for mode, filas, df_mb, datos_mb, worker_mb in resultados:
+        print(f"{mode:<9} {filas:>12,}  {df_mb:13.1f} {datos_mb:13.1f} {worker_mb:14.1f}")
+    (_, _, *antes), (_, _, *despues) = resultados
+    print("Reducción:  " + "  ".join(
+        f"{nombre} {a / d:.1f}×" for nombre, a, d in zip(("DataFrame", "carga", "worker"), antes, despues)
+    ))
+
+
+if __name__ == "__main__":
+    main()
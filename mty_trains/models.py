@@ -0,0 +1,126 @@
+"""Carga de los pipelines de predicción y scoring vectorizado.
+
+Los pipelines de ``./artifacts/`` se cargan una vez por proceso (el tablero
+los envuelve en ``st.cache_resource``) y se puntúan por lotes: una sola
+llamada a ``predict``/``predict_proba`` por bloque de incidentes en lugar de
+un DataFrame de una fila por predicción. Con ``MTY_MODELO_COMPACTO=1`` se
+carga en su lugar la exportación compacta (``mty_trains.train``) si
+corresponde al pickle: carga y responde más rápido a una fila, pero es varias
+veces más lenta en lotes (CSV de incidentes, micro-batches del servicio).
+"""
+import io
+import os
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from mty_trains import forest, snapshot
+
+ARTIFACTS_DIR = Path("./artifacts")
+CLASSIFIER_FILE = "pipeline_rf_model_class.pkl"
+REGRESSOR_FILE = "pipeline_rf_model_regr.pkl"
+
+# Contrato de entrada de los modelos (el mismo x_sample de la pestaña de predicciones)
+FEATURES = ['year', 'month', 'day', 'Linea', 'Sistema', 'Veh', 'long_desc']
+NUMERIC_FEATURES = ['year', 'month', 'day', 'long_desc']
+
+CHUNK_SIZE = 5000
+
+COMPACT_MODELS = os.environ.get("MTY_MODELO_COMPACTO", "0") == "1"
+
+
+def load_model(path, compact=COMPACT_MODELS):
+    """Modelo en ``path``: la exportación compacta si corresponde a ese pickle, o el pickle."""
+    path = Path(path)
+    compact_dir = forest.compact_path(path)
+    if compact and (compact_dir / "meta.json").is_file():
+        model = forest.CompactForest(compact_dir)
+        # Un pickle reentrenado a mano deja obsoleta la exportación: se usa el pickle
+        if not path.exists() or model.meta.get('source_checksum') == snapshot.checksum(path):
+            return model
+    return joblib.load(path)
+
+
+def load_pipelines(artifacts_dir=ARTIFACTS_DIR):
+    """Devuelve ``(clasificador, regresor)`` cargados desde ``artifacts_dir``."""
+    artifacts_dir = Path(artifacts_dir)
+    loaded_clf = load_model(artifacts_dir / CLASSIFIER_FILE)
+    loaded_regr = load_model(artifacts_dir / REGRESSOR_FILE)
+    return loaded_clf, loaded_regr
+
+
+def build_features(df):
+    """Arma la matriz ``FEATURES`` a partir de incidentes.
+
+    Acepta las columnas del modelo tal cual o las del dataset limpio:
+    ``year``/``month``/``day`` se derivan de ``Fecha`` y ``long_desc`` de la
+    longitud de ``Descripcion`` cuando no vienen. Las columnas categóricas
+    del dataset se pasan a sus valores, para que el entrenamiento vea los
+    mismos tipos que la predicción.
+    """
+    df = df.copy()
+    if not {'year', 'month', 'day'}.issubset(df.columns) and 'Fecha' in df.columns:
+        fecha = pd.to_datetime(df['Fecha'], errors='coerce')
+        df['year'], df['month'], df['day'] = fecha.dt.year, fecha.dt.month, fecha.dt.day
+    if 'long_desc' not in df.columns and 'Descripcion' in df.columns:
+        df['long_desc'] = df['Descripcion'].astype(str).where(df['Descripcion'].notna(), '').str.len()
+
+    missing = [col for col in FEATURES if col not in df.columns]
+    if missing:
+        raise ValueError(f"Faltan columnas para la predicción: {', '.join(missing)}")
+
+    for col in NUMERIC_FEATURES:
+        df[col] = pd.to_numeric(df[col])
+    for col in FEATURES:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Los valores tal cual, como llegan del formulario y del servicio (enteros para Linea y Veh)
+            df[col] = np.asarray(df[col])
+    return df[FEATURES]
+
+
+def score(loaded_clf, loaded_regr, X):
+    """Predicciones vectorizadas para las filas de ``X``.
+
+    Devuelve ``retraso_estimado``, ``prob_desalojo`` y ``desalojo_predicho``;
+    la clase se toma del mismo ``predict_proba`` para no recorrer el bosque
+    dos veces.
+    """
+    proba = loaded_clf.predict_proba(X)
+    classes = list(loaded_clf.classes_)
+    positive = classes.index(1) if 1 in classes else len(classes) - 1
+    return pd.DataFrame({
+        'retraso_estimado': loaded_regr.predict(X),
+        'prob_desalojo': proba[:, positive],
+        'desalojo_predicho': loaded_clf.classes_[proba.argmax(axis=1)],
+    }, index=X.index)
+
+
+def score_batches(loaded_clf, loaded_regr, df, chunk_size=CHUNK_SIZE):
+    """Genera ``df`` por bloques de ``chunk_size`` filas con sus predicciones."""
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        yield pd.concat([chunk, score(loaded_clf, loaded_regr, build_features(chunk))], axis=1)
+
+
+def read_incidents(data, name):
+    """Lee un lote de incidentes subido como CSV (``;`` o ``,``) o Parquet."""
+    if str(name).lower().endswith('.parquet'):
+        return pd.read_parquet(io.BytesIO(data))
+    return pd.read_csv(io.BytesIO(data), sep=None, engine='python', encoding='utf-8')
+
+
+def score_to_csv(loaded_clf, loaded_regr, df, chunk_size=CHUNK_SIZE, on_chunk=None):
+    """Puntúa ``df`` por bloques y escribe el resultado como CSV ``;``-delimitado.
+
+    ``on_chunk(filas_procesadas, total)`` se llama después de cada bloque.
+    """
+    buffer = io.StringIO()
+    done = 0
+    for chunk in score_batches(loaded_clf, loaded_regr, df, chunk_size):
+        chunk.to_csv(buffer, sep=';', index=False, header=done == 0)
+        done += len(chunk)
+        if on_chunk is not None:
+            on_chunk(done, len(df))
+    return buffer.getvalue().encode('utf-8')
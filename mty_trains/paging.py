@@ -0,0 +1,75 @@
+"""Vista paginada del dataset: orden, columnas y páginas del lado del servidor.
+
+``SortIndex`` guarda, por columna, el orden global de todas las filas
+(calculado la primera vez que se ordena por esa columna). Ordenar una
+selección es entonces recorrer ese orden y quedarse con las filas
+seleccionadas, sin volver a ordenar. Al navegador sólo viaja la página
+visible.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+EXPORT_CHUNK_ROWS = 50_000
+
+
+def _sort_keys(series):
+    """Llave numérica ordenable de una columna (NaN/NaT al final)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        # Categorías ordenadas por valor para que el orden no dependa del orden de llegada
+        rank = np.argsort(np.argsort(series.cat.categories.to_numpy(), kind='stable'))
+        return np.where(codes >= 0, rank[codes], len(rank))
+    return series.to_numpy()
+
+
+class SortIndex:
+    """Orden global por columna de las filas de ``df`` (perezoso, por columna)."""
+
+    def __init__(self, df):
+        self.df = df
+        self._orders = {}
+
+    def order(self, col):
+        if col not in self._orders:
+            keys = _sort_keys(self.df[col])
+            if keys.dtype == object:
+                keys = self.df[col].astype(str).to_numpy()
+            self._orders[col] = np.argsort(keys, kind='stable')
+        return self._orders[col]
+
+    def sort(self, positions, col, ascending=True):
+        """``positions`` reordenadas por ``col`` usando el orden global."""
+        mask = np.zeros(len(self.df), dtype=bool)
+        mask[positions] = True
+        order = self.order(col)
+        ordered = order[mask[order]]
+        return ordered if ascending else ordered[::-1]
+
+
+def _gather(df, positions, columns):
+    # Columna por columna: df[columns] copiaría todas las filas antes del take
+    return pd.DataFrame({col: df[col].take(positions) for col in columns})
+
+
+def page(df, positions, number, size, columns):
+    """Filas de la página ``number`` (desde 1) con sólo ``columns``."""
+    start = (number - 1) * size
+    return _gather(df, positions[start:start + size], columns)
+
+
+def page_count(total, size):
+    return max(1, -(-total // size))
+
+
+def iter_csv(df, positions, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    """CSV (``;``) de la selección, generado por bloques de ``chunk_rows`` filas."""
+    for start in range(0, max(len(positions), 1), chunk_rows):
+        buffer = io.StringIO()
+        _gather(df, positions[start:start + chunk_rows], columns).to_csv(
+            buffer, sep=';', index=False, header=start == 0
+        )
+        yield buffer.getvalue().encode('utf-8')
@@ -0,0 +1,170 @@
+"""Instrumentación opcional de cada rerun del tablero.
+
+Se activa con la variable de entorno ``MTY_PERFIL=1`` o con ``?perfil=1`` en
+la URL. Cada sección nombrada (``with perfil.section(...)``) registra su
+duración, el número de filas que procesó y la variación de memoria residente;
+las funciones cacheadas envueltas con ``tracked`` cuentan aciertos y fallos
+de caché. Al terminar el rerun el perfil se agrega como una línea JSON a
+``logs/perfil.jsonl`` (o a ``MTY_PERFIL_LOG``) para agregarlo entre sesiones.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+LOG_PATH = Path(os.environ.get("MTY_PERFIL_LOG", "./logs/perfil.jsonl"))
+
+_local = threading.local()
+_lock = threading.Lock()
+
+# Totales del proceso (todas las sesiones)
+cache_calls = Counter()
+cache_misses = Counter()
+
+
+def enabled_by_env():
+    return os.environ.get("MTY_PERFIL", "").lower() in ("1", "true", "si", "sí")
+
+
+def rss_mb():
+    """Memoria residente del proceso en MB (Linux), o None si no se puede leer."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+class RerunProfile:
+    """Secciones y eventos de caché de un rerun."""
+
+    def __init__(self, enabled=False, session_id=None):
+        self.enabled = enabled
+        self.session_id = session_id
+        self.sections = []
+        self.cache = {}
+        self.misses = Counter()
+        self._start = time.perf_counter()
+        self._rss_start = rss_mb() if enabled else None
+
+    @contextmanager
+    def section(self, name, rows=None):
+        """Mide el bloque; el dict que entrega permite fijar ``rows`` al final."""
+        info = {'section': name, 'rows': rows}
+        if not self.enabled:
+            yield info
+            return
+        rss = rss_mb()
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            after = rss_mb()
+            info['ms'] = round((time.perf_counter() - start) * 1000, 3)
+            info['rss_delta_mb'] = None if rss is None or after is None else round(after - rss, 3)
+            self.sections.append(info)
+
+    def cache_event(self, name, hit):
+        counts = self.cache.setdefault(name, {'hits': 0, 'misses': 0})
+        counts['hits' if hit else 'misses'] += 1
+
+    def merge(self, other):
+        """Suma las secciones y eventos de caché de ``other`` (p. ej. el de un hilo auxiliar)."""
+        self.sections.extend(other.sections)
+        for name, counts in other.cache.items():
+            mine = self.cache.setdefault(name, {'hits': 0, 'misses': 0})
+            mine['hits'] += counts['hits']
+            mine['misses'] += counts['misses']
+
+    def record(self):
+        """Resumen del rerun (lo que se escribe en el JSON-lines)."""
+        rss = rss_mb()
+        return {
+            'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+            'session': self.session_id,
+            'total_ms': round((time.perf_counter() - self._start) * 1000, 3),
+            'rss_mb': None if rss is None else round(rss, 3),
+            'rss_delta_mb': None if rss is None or self._rss_start is None else round(rss - self._rss_start, 3),
+            'sections': self.sections,
+            'cache': self.cache,
+        }
+
+    def finish(self, path=LOG_PATH):
+        if not self.enabled:
+            return None
+        record = self.record()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+
+def start_rerun(enabled=False, session_id=None):
+    """Crea el perfil del rerun actual (uno por hilo de script)."""
+    _local.profile = RerunProfile(enabled, session_id)
+    return _local.profile
+
+
+def current():
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        profile = _local.profile = RerunProfile()
+    return profile
+
+
+def record_cache_event(name, hit):
+    """Anota un acierto/fallo de ``name`` en el proceso y en el rerun actual."""
+    with _lock:
+        cache_calls[name] += 1
+        cache_misses[name] += not hit
+    current().cache_event(name, hit)
+
+
+def tracked(cache_decorator, name=None):
+    """Aplica ``cache_decorator`` (p. ej. ``st.cache_data``) contando aciertos y fallos.
+
+    El cuerpo de la función sólo corre en un fallo de caché: ahí se anota el
+    fallo; cualquier llamada que no lo anotó fue un acierto.
+    """
+    def wrap(func):
+        key = name or func.__name__
+
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            current().misses[key] += 1
+            return func(*args, **kwargs)
+
+        cached = cache_decorator(body)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            profile = current()
+            before = profile.misses[key]
+            result = cached(*args, **kwargs)
+            record_cache_event(key, profile.misses[key] == before)
+            return result
+
+        call.clear = cached.clear
+        return call
+    return wrap
+
+
+def cache_summary():
+    """Tasa de aciertos por función cacheada, acumulada en el proceso."""
+    with _lock:
+        return [
+            {
+                'funcion': key,
+                'llamadas': cache_calls[key],
+                'fallos': cache_misses[key],
+                'tasa_aciertos': round(1 - cache_misses[key] / cache_calls[key], 3) if cache_calls[key] else None,
+            }
+            for key in sorted(cache_calls)
+        ]
@@ -0,0 +1,148 @@
+"""Confiabilidad de la flota: MTBF y fallas repetidas por vehículo y sistema.
+
+``ReliabilityIndex`` guarda la permutación de filas ordenada por
+(``Veh``, ``Sistema``, ``Fecha``). Sobre una selección del tablero, las
+filas se toman en ese orden (filtrar una permutación ordenada la deja
+ordenada) y todo se calcula con operaciones por segmento sobre arreglos:
+
+- días desde la falla anterior del mismo vehículo y sistema (``diff`` que se
+  corta en cada cambio de segmento);
+- fallas del segmento en la ventana móvil de ``ventana`` días (búsqueda
+  binaria sobre la llave ordenada);
+- falla repetida: la anterior del mismo vehículo y sistema fue hace
+  ``repeticion`` días o menos;
+- MTBF: (última - primera) / (fallas - 1), igual a la media de los intervalos.
+
+Al agregar filas nuevas sólo se ordenan ésas y se insertan en su lugar.
+"""
+import numpy as np
+import pandas as pd
+
+REPEAT_DAYS = 30
+WINDOW_DAYS = 90
+
+# Días desde 1900-01-01 en los bits bajos de la llave: (vehículo, sistema, día)
+_DAY0 = np.datetime64('1900-01-01', 'D')
+_DAY_BITS = 18
+
+
+def _days(fecha):
+    return (fecha.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]') - _DAY0).astype(np.int64)
+
+
+class ReliabilityIndex:
+    """Filas ordenadas por (vehículo, sistema, fecha); inmutable, ``extended`` arma el siguiente."""
+
+    def __init__(self, df, _arrays=None):
+        if _arrays is None:
+            _arrays = self._sorted_arrays(df, 0)
+        self.positions, self.veh, self.sistema, self.day = _arrays
+        self.n_sistemas = len(df['Sistema'].cat.categories)
+        self.n_rows = len(df)
+
+    @staticmethod
+    def _sorted_arrays(df, offset):
+        fecha = df['Fecha']
+        valid = fecha.notna().to_numpy()
+        veh = df['Veh'].cat.codes.to_numpy().astype(np.int64)
+        sistema = df['Sistema'].cat.codes.to_numpy().astype(np.int64)
+        # Sin fecha, vehículo o sistema no hay intervalo que medir
+        valid &= (veh >= 0) & (sistema >= 0)
+        positions = np.flatnonzero(valid)
+        day = np.zeros(len(df), dtype=np.int64)
+        day[valid] = _days(fecha[valid])
+        order = np.lexsort((positions, day[positions], sistema[positions], veh[positions]))
+        positions = positions[order]
+        # En 32 bits: el índice ocupa la mitad (las llaves se arman en 64 al consultar)
+        return tuple(a.astype(np.int32) for a in (positions + offset, veh[positions], sistema[positions], day[positions]))
+
+    def _keys(self, veh, sistema, day, n_sistemas):
+        return ((veh.astype(np.int64) * n_sistemas + sistema) << _DAY_BITS) + day
+
+    def extended(self, df, delta):
+        """Índice de ``df`` (el dataset ya con ``delta`` al final, categorías alineadas)."""
+        offset = len(df) - len(delta)
+        new = self._sorted_arrays(delta, offset)
+        n_sistemas = len(df['Sistema'].cat.categories)
+        # Las categorías nuevas van al final: los códigos existentes no cambian, sólo la llave
+        keys = self._keys(self.veh, self.sistema, self.day, n_sistemas)
+        at = np.searchsorted(keys, self._keys(new[1], new[2], new[3], n_sistemas), side='right')
+        arrays = tuple(np.insert(old, at, added) for old, added in zip((self.positions, self.veh, self.sistema, self.day), new))
+        return ReliabilityIndex(df, arrays)
+
+    def events(self, df, positions=None, window=WINDOW_DAYS, repeat=REPEAT_DAYS):
+        """Fallas de la selección en orden (Veh, Sistema, Fecha) con intervalo, ventana y repetición."""
+        keep = slice(None)
+        if positions is not None:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            mask[positions] = True
+            keep = mask[self.positions]
+        rows, veh, sistema, day = (a[keep] for a in (self.positions, self.veh, self.sistema, self.day))
+
+        start = np.ones(len(rows), dtype=bool)
+        start[1:] = (veh[1:] != veh[:-1]) | (sistema[1:] != sistema[:-1])
+        gap = np.diff(day, prepend=0).astype(np.float64)
+        gap[start] = np.nan
+
+        # Fallas del mismo segmento en (día - ventana, día]: la llave ordenada sólo crece dentro del segmento
+        keys = self._keys(veh, sistema, day, self.n_sistemas)
+        en_ventana = np.arange(len(keys)) - np.searchsorted(keys, keys - window + 1, side='left') + 1
+
+        out = df[['Veh', 'Sistema', 'Linea', 'Fecha']].take(rows).reset_index(drop=True)
+        out['dias_desde_anterior'] = gap
+        out['fallas_ventana'] = en_ventana
+        out['tasa_30d'] = en_ventana * 30.0 / window
+        out['repetida'] = gap <= repeat
+        return out
+
+
+def _segments(*columns):
+    """Inicio de cada segmento de valores iguales consecutivos en ``columns``."""
+    n = len(columns[0])
+    start = np.ones(n, dtype=bool)
+    if n:
+        start[1:] = np.logical_or.reduce([c[1:] != c[:-1] for c in columns])
+    return np.flatnonzero(start)
+
+
+def _reduce(events, keys):
+    """Fallas, primera/última fecha, MTBF, repetidas y tasa máxima por segmento de ``keys`` (``events`` ordenado)."""
+    codes = [events[k].cat.codes.to_numpy() for k in keys]
+    starts = _segments(*codes)
+    if not len(starts):
+        return pd.DataFrame(columns=[*keys, 'fallas', 'primera', 'ultima', 'mtbf_dias', 'repetidas', 'pct_repetidas', 'tasa_max_30d'])
+    fecha = events['Fecha'].to_numpy()
+    fallas = np.diff(np.append(starts, len(events)))
+    primera = np.minimum.reduceat(fecha, starts)
+    ultima = np.maximum.reduceat(fecha, starts)
+    repetidas = np.add.reduceat(events['repetida'].to_numpy(dtype=np.int64), starts)
+    span = (ultima - primera) / np.timedelta64(1, 'D')
+    out = events[keys].iloc[starts].reset_index(drop=True)
+    out['fallas'] = fallas
+    out['primera'] = primera
+    out['ultima'] = ultima
+    out['mtbf_dias'] = np.where(fallas > 1, span / np.maximum(fallas - 1, 1), np.nan)
+    out['repetidas'] = repetidas
+    out['pct_repetidas'] = 100.0 * repetidas / fallas
+    out['tasa_max_30d'] = np.maximum.reduceat(events['tasa_30d'].to_numpy(), starts)
+    return out
+
+
+def by_system(events):
+    """Resumen por (Veh, Sistema)."""
+    return _reduce(events, ['Veh', 'Sistema'])
+
+
+def by_vehicle(events):
+    """Resumen por vehículo; el MTBF cuenta las fallas de todos sus sistemas."""
+    return _reduce(events, ['Veh'])
+
+
+def fleet(events):
+    """MTBF medio de los vehículos con más de una falla y porcentaje de fallas repetidas."""
+    vehiculos = by_vehicle(events)
+    return {
+        'fallas': len(events),
+        'mtbf_dias': float(vehiculos['mtbf_dias'].mean()) if vehiculos['mtbf_dias'].notna().any() else None,
+        'pct_repetidas': float(100.0 * events['repetida'].mean()) if len(events) else None,
+    }
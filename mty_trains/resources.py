@@ -0,0 +1,126 @@
+"""Recursos y resultados cacheados que comparten todas las sesiones del proceso.
+
+Viven en el paquete (y no en ``app.py``) para que el precalentamiento
+(``mty_trains.warmup``) llene exactamente las mismas entradas de caché que
+después lee el tablero: ``st.cache_resource`` identifica cada función por su
+módulo y nombre, y los agregados van a la ``ResultCache`` del proceso con la
+misma llave canónica. Los agregados se piden al backend de consultas
+(``mty_trains.backend``, ``MTY_BACKEND``).
+"""
+import streamlit as st
+
+from mty_trains import backend, correlation, cube, ingest, models, profiling, reliability, resultcache, snapshot, store, timeseries
+
+CSV_PATH = "./data/02_data_for_ML.csv"
+ARTIFACTS_DIR = "./artifacts"
+
+
+@profiling.tracked(st.cache_resource)
+def load_data():
+    """Almacén del dataset con los deltas ya ingestados."""
+    # Se carga el snapshot columnar del CSV limpio (fechas y categorías ya tipadas);
+    # sólo se vuelve a parsear el CSV si su checksum cambió:
+    df = snapshot.load_dataset(CSV_PATH)
+
+    # El almacén arma el cubo de agregados (Linea × Sistema × Cat × Veh × año × mes ×
+    # semana ISO × desalojo), el índice de bitmaps de los filtros y el de texto, y
+    # aplica los deltas ya ingestados:
+    almacen = store.FailureStore(df)
+    almacen.sync(ingest.DELTAS_DIR)
+    return almacen
+
+
+@profiling.tracked(st.cache_resource)
+def load_models():
+    """Pipelines de predicción (clasificador, regresor)."""
+    return models.load_pipelines(ARTIFACTS_DIR)
+
+
+@profiling.tracked(st.cache_resource)
+def load_arrow_backend():
+    """Dataset particionado del backend ``arrow``."""
+    return backend.ArrowBackend(backend.PARTITIONS_DIR)
+
+
+@profiling.tracked(st.cache_resource)
+def cache_resultados():
+    """Agregados y figuras serializadas, compartidos por las sesiones (LRU acotada en MB)."""
+    return resultcache.ResultCache()
+
+
+@profiling.tracked(st.cache_resource(max_entries=32))
+def seleccionar(_estado, version, filtros):
+    """Posiciones de las filas que cumplen ``filtros`` (bitmaps + búsqueda de texto)."""
+    posiciones = _estado.index.select(*filtros[:-1])
+    return _estado.text.search(filtros[-1], posiciones) if filtros[-1] else posiciones
+
+
+@profiling.tracked(st.cache_resource(max_entries=32))
+def filtrar_cubo(_estado, version, filtros, nombre):
+    """Celdas del cubo ``nombre`` que cumplen ``filtros``."""
+    return cube.filter_cube(_estado.cubes[nombre], *filtros[:-1])
+
+
+@profiling.tracked(st.cache_resource(max_entries=2))
+def rangos(_estado, version):
+    """Códigos de rango de las columnas numéricas; se rehacen sólo al cambiar la versión."""
+    return correlation.RankIndex(_estado.df)
+
+
+def refrescar_consultas():
+    """Una vez por rerun, tras la ingesta: el backend ``arrow`` vuelve a listar sus particiones si cambiaron."""
+    if backend.BACKEND == "arrow":
+        load_arrow_backend().refresh()
+
+
+def consultas(estado):
+    """Backend de agregados para ``estado``: los cubos en memoria o el dataset particionado."""
+    if backend.BACKEND == "arrow":
+        return load_arrow_backend()
+    return backend.PandasBackend(
+        estado,
+        lambda filtros, nombre: filtrar_cubo(estado, estado.version, filtros, nombre),
+        lambda filtros: seleccionar(estado, estado.version, filtros),
+    )
+
+
+def agregado(estado, filtros, by, solo_desalojos=False):
+    """Roll-up de las filas filtradas; lo comparten las vistas y sesiones que agrupan por lo mismo."""
+    motor = consultas(estado)
+    clave = resultcache.canonical_key('agregado', (motor.name, motor.version), filtros, tuple(by), solo_desalojos)
+    return cache_resultados().get_or_compute(clave, lambda: motor.rollup(filtros, by, solo_desalojos), name='agregado')
+
+
+def tendencia(estado, filtros, periodo):
+    """Serie por línea rellenada con ceros + estacionalidad, en un solo rolling agrupado."""
+    motor = consultas(estado)
+
+    def calcular():
+        conteos = motor.rollup(filtros, ('Linea', periodo))
+        return (
+            timeseries.trend(conteos, 'Linea', periodo)
+            .rename(columns={periodo: 'Periodo', 'conteo': 'conteo_fallas'})
+        )
+
+    clave = resultcache.canonical_key('tendencia', (motor.name, motor.version), filtros, periodo)
+    return cache_resultados().get_or_compute(clave, calcular, name='tendencia')
+
+
+def confiabilidad(estado, filtros, ventana=reliability.WINDOW_DAYS, repeticion=reliability.REPEAT_DAYS):
+    """Fallas filtradas en orden (Veh, Sistema, Fecha) con intervalo, tasa móvil y repetición."""
+    def calcular():
+        posiciones = seleccionar(estado, estado.version, filtros)
+        return estado.reliability.events(estado.df, posiciones, ventana, repeticion)
+
+    clave = resultcache.canonical_key('confiabilidad', estado.version, filtros, ventana, repeticion)
+    return cache_resultados().get_or_compute(clave, calcular, name='confiabilidad')
+
+
+def correlaciones(estado, filtros, metodo='spearman', muestreo=False):
+    """Matriz de correlación de las filas filtradas (Spearman sin volver a ordenar)."""
+    def calcular():
+        posiciones = seleccionar(estado, estado.version, filtros)
+        return rangos(estado, estado.version).matrix(estado.df, posiciones, metodo, muestreo)
+
+    clave = resultcache.canonical_key('correlaciones', estado.version, filtros, metodo, muestreo)
+    return cache_resultados().get_or_compute(clave, calcular, name='correlaciones')
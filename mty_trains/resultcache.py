@@ -0,0 +1,122 @@
+"""Caché de resultados compartida por todas las sesiones del proceso.
+
+Guarda agregados (DataFrames) y figuras de plotly serializadas a JSON bajo una
+llave canónica: el hash del estado de filtros normalizado (selecciones
+ordenadas, rango de años, búsqueda) más la versión del dataset y el nombre
+del resultado. Dos sesiones con los mismos filtros, elegidos en cualquier
+orden, comparten la entrada. El tamaño total está acotado en bytes
+(``MTY_CACHE_MB``, 256 por defecto) y se desaloja lo usado hace más tiempo.
+
+Los resultados se comparten tal cual entre sesiones: quien los lee no los
+modifica (``rename``/``sort_values`` devuelven copias).
+"""
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from mty_trains import profiling
+
+MAX_MB = float(os.environ.get("MTY_CACHE_MB", 256))
+
+
+def _canonical(values):
+    # Escalares de numpy como nativos: el widget y el código pueden entregar cualquiera de los dos
+    return tuple(sorted(v.item() if isinstance(v, np.generic) else v for v in values))
+
+
+def canonical_filters(lineas, sistemas, categorias, vehiculos, anios, consulta=()):
+    """Tupla de filtros normalizada: el orden en que se eligieron no cuenta."""
+    return (
+        _canonical(lineas), _canonical(sistemas), _canonical(categorias),
+        _canonical(vehiculos), (int(min(anios)), int(max(anios))), tuple(consulta),
+    )
+
+
+def canonical_key(name, version, filtros, *extra):
+    """Hash estable del resultado ``name`` para ``filtros`` en la versión ``version``."""
+    return hashlib.blake2b(repr((name, version, filtros, extra)).encode(), digest_size=16).hexdigest()
+
+
+def sizeof(value):
+    """Bytes aproximados que ocupa ``value`` en memoria."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True, index=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """LRU acotada en bytes con métricas de aciertos; segura entre hilos."""
+
+    def __init__(self, max_bytes=int(MAX_MB * 2**20)):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = sizeof(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            previo = self._entries.pop(key, None)
+            if previo is not None:
+                self.bytes -= previo[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, freed) = self._entries.popitem(last=False)
+                self.bytes -= freed
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute, name=None):
+        """Valor guardado en ``key``, o ``compute()`` (que se guarda) si no está.
+
+        Con ``name`` el acierto/fallo se anota también en el perfil del rerun.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        hit = value is not missing
+        if name is not None:
+            profiling.record_cache_event(name, hit)
+        return value if hit else self.put(key, compute())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            calls = self.hits + self.misses
+            return {
+                'entradas': len(self._entries),
+                'MB': round(self.bytes / 2**20, 3),
+                'MB_max': round(self.max_bytes / 2**20, 3),
+                'aciertos': self.hits,
+                'fallos': self.misses,
+                'desalojos': self.evictions,
+                'tasa_aciertos': round(self.hits / calls, 3) if calls else None,
+            }
@@ -0,0 +1,205 @@
+"""Búsqueda de texto sobre ``Descripcion`` y ``Correccion`` con índice invertido.
+
+Los textos se normalizan (minúsculas, sin acentos) y se parten en términos.
+El índice guarda, por término, los textos distintos que lo contienen y, por
+texto, las filas donde aparece; una consulta nunca vuelve a recorrer los
+strings. El vocabulario de ``data/lista_descripcion_fallos.csv`` se agrega a
+la lista de términos para sugerir completados aunque todavía no haya filas.
+
+Consultas: varios términos se combinan con AND; el último se busca como
+prefijo mientras se escribe (``puerta no ab`` encuentra "puerta no abre") y
+cualquier término con ``*`` al final también (``pantog*``).
+"""
+import bisect
+import re
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+TEXT_COLS = ('Descripcion', 'Correccion')
+VOCABULARY_PATH = Path("./data/lista_descripcion_fallos.csv")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def fold(text):
+    """Minúsculas y sin acentos: "Pantógrafo" -> "pantografo"."""
+    decomposed = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    return _TOKEN.findall(fold(text))
+
+
+def parse_query(text):
+    """Consulta normalizada y hashable: tupla de (término, es_prefijo)."""
+    text = text or ''
+    words = text.split()
+    terms = []
+    for i, word in enumerate(words):
+        tokens = tokenize(word)
+        if not tokens:
+            continue
+        prefix = word.endswith('*') or (i == len(words) - 1 and not text[-1].isspace())
+        terms.extend((token, False) for token in tokens[:-1])
+        terms.append((tokens[-1], prefix))
+    return tuple(terms)
+
+
+def load_vocabulary(path=VOCABULARY_PATH):
+    """Términos del catálogo de descripciones de fallas (vacío si no existe)."""
+    try:
+        lines = Path(path).read_text(encoding='utf-8', errors='replace').splitlines()
+    except OSError:
+        return set()
+    return {token for line in lines for token in tokenize(line)}
+
+
+def _encode(values, categories=None):
+    """Códigos de los textos de ``values`` sobre ``categories`` extendidas con los nuevos.
+
+    Los textos ya existentes conservan su código; -1 es texto vacío (NaN).
+    Sólo se buscan los textos distintos de ``values`` en ``categories``.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Sólo las categorías usadas: en el almacén, las de un delta son las de todo el dataset
+        raw = values.cat.codes.to_numpy()
+        used = np.unique(raw[raw >= 0])
+        uniques = values.cat.categories[used]
+        codes = np.where(raw >= 0, np.searchsorted(used, raw), -1)
+    else:
+        codes, uniques = pd.factorize(values)
+    codes = codes.astype(np.int32)
+    uniques = pd.Index(uniques, dtype=object)
+    if categories is None:
+        return uniques, codes, uniques
+    found = categories.get_indexer(uniques)
+    new = uniques[found < 0]
+    mapping = found.copy()
+    mapping[found < 0] = len(categories) + np.arange(len(new))
+    return categories.append(new), np.where(codes >= 0, mapping[codes], -1).astype(np.int32), new
+
+
+def _group_rows(codes, n_codes):
+    """Filas ordenadas por código y el offset de inicio de cada código."""
+    order = np.argsort(codes, kind='stable').astype(np.int32)
+    return order, np.searchsorted(codes[order], np.arange(n_codes + 1))
+
+
+def _merge_groups(groups, codes, first_row, n_codes):
+    """``groups`` con las filas ``first_row + i`` (códigos ``codes``) agregadas al final de su código.
+
+    Sólo se ordenan las filas nuevas; se insertan en ``order`` al final del
+    grupo de su código (las nuevas posiciones son mayores que todas las previas).
+    """
+    order, bounds = groups
+    # Los códigos nuevos empiezan vacíos en el orden previo
+    bounds = np.concatenate([bounds, np.full(n_codes + 1 - len(bounds), bounds[-1])])
+    new_order, new_bounds = _group_rows(codes, n_codes)
+    at = bounds[codes[new_order] + 1]
+    return np.insert(order, at, new_order + first_row), bounds + new_bounds
+
+
+class TextIndex:
+    """Índice invertido término -> textos -> filas sobre las columnas de texto de ``df``."""
+
+    def __init__(self, df, vocabulary=()):
+        self.n = len(df)
+        self.columns = [col for col in TEXT_COLS if col in df.columns]
+        self.vocabulary = frozenset(vocabulary)
+        self.categories, self.codes, self.postings, self.groups = {}, {}, {}, {}
+        for col in self.columns:
+            self.categories[col], self.codes[col], textos = _encode(df[col])
+            self.postings[col] = self._add_postings({}, textos, 0)
+            self.groups[col] = _group_rows(self.codes[col], len(self.categories[col]))
+        self._refresh_terms()
+
+    @staticmethod
+    def _add_postings(postings, textos, first_code):
+        """Agrega a ``postings`` (término -> códigos) los textos nuevos desde ``first_code``."""
+        nuevos = {}
+        for code, texto in enumerate(textos, start=first_code):
+            for token in set(tokenize(texto)):
+                nuevos.setdefault(token, []).append(code)
+        for token, codes in nuevos.items():
+            previos = postings.get(token)
+            codes = np.array(codes, dtype=np.int32)
+            postings[token] = codes if previos is None else np.concatenate([previos, codes])
+        return postings
+
+    def _refresh_terms(self):
+        self.terms = sorted(self.vocabulary.union(*self.postings.values()))
+
+    def extended(self, delta):
+        """Nuevo índice con las filas de ``delta`` agregadas al final.
+
+        Sólo se tokenizan los textos que no existían; las filas nuevas se
+        ordenan entre sí y se insertan al final del grupo de su código, y los
+        términos nuevos se insertan en la lista ordenada.
+        """
+        new = TextIndex.__new__(TextIndex)
+        new.n = self.n + len(delta)
+        new.columns = self.columns
+        new.vocabulary = self.vocabulary
+        new.categories, new.codes, new.postings, new.groups = {}, {}, {}, {}
+        terms = set()
+        for col in self.columns:
+            first_code = len(self.categories[col])
+            new.categories[col], codes, textos = _encode(delta[col], self.categories[col])
+            new.codes[col] = np.concatenate([self.codes[col], codes])
+            new.postings[col] = self._add_postings(dict(self.postings[col]), textos, first_code)
+            new.groups[col] = _merge_groups(self.groups[col], codes, self.n, len(new.categories[col]))
+            terms.update(token for texto in textos for token in tokenize(texto))
+        new.terms = list(self.terms)
+        for term in sorted(terms):
+            at = bisect.bisect_left(new.terms, term)
+            if at == len(new.terms) or new.terms[at] != term:
+                new.terms.insert(at, term)
+        return new
+
+    def expand(self, term, prefix=False):
+        """Términos conocidos que corresponden a ``term`` (todos los que empiezan con él si es prefijo)."""
+        if not prefix:
+            return [term] if any(term in postings for postings in self.postings.values()) else []
+        start = bisect.bisect_left(self.terms, term)
+        stop = bisect.bisect_left(self.terms, term + '\uffff', lo=start)
+        return self.terms[start:stop]
+
+    def _rows(self, col, codes):
+        order, bounds = self.groups[col]
+        return np.concatenate([order[bounds[c]:bounds[c + 1]] for c in codes])
+
+    def term_rows(self, term, prefix=False):
+        """Posiciones (ordenadas) de las filas que contienen ``term`` en alguna columna."""
+        rows = []
+        for col in self.columns:
+            postings = self.postings[col]
+            codes = [postings[token] for token in self.expand(term, prefix) if token in postings]
+            if codes:
+                rows.append(self._rows(col, np.unique(np.concatenate(codes))))
+        return np.unique(np.concatenate(rows)) if rows else np.empty(0, dtype=np.intp)
+
+    def search(self, query, positions=None):
+        """Filas que contienen todos los términos de ``query`` (ver ``parse_query``).
+
+        Con ``positions`` (por ejemplo, la selección de los filtros) el
+        resultado se intersecta con ellas.
+        """
+        result = positions
+        for term, prefix in sorted(query, key=lambda item: item[1]):
+            rows = self.term_rows(term, prefix)
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+            if not len(result):
+                break
+        return np.arange(self.n) if result is None else result
+
+    def suggest(self, prefix, limit=8):
+        """Completados de ``prefix``: primero los de más textos distintos, luego los del catálogo."""
+        frecuencia = {
+            term: sum(len(postings.get(term, ())) for postings in self.postings.values())
+            for term in self.expand(fold(prefix), prefix=True)
+        }
+        return sorted(frecuencia, key=lambda term: -frecuencia[term])[:limit]
@@ -0,0 +1,234 @@
+"""Servicio de predicción sin Streamlit, con micro-batching de solicitudes.
+
+Recibe incidentes con el mismo esquema ``x_sample`` de la vista de
+predicciones (``year, month, day, Linea, Sistema, Veh, long_desc``). Los
+pipelines se cargan una vez; las solicitudes concurrentes se agrupan durante
+una ventana corta para que una sola llamada a ``predict``/``predict_proba``
+atienda a muchas.
+
+Uso desde la raíz del repo::
+
+    python -m mty_trains.service --port 8502          # HTTP: POST /predict, GET /metrics
+    python -m mty_trains.service --stdin < in.jsonl   # JSON-lines por stdin/stdout
+"""
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from mty_trains import models
+
+MAX_BATCH = 256
+MAX_WAIT_MS = 5.0
+
+
+class MicroBatcher:
+    """Agrupa solicitudes en lotes y las puntúa en un hilo dedicado.
+
+    Un lote se cierra al juntar ``max_batch`` filas o al pasar ``max_wait_ms``
+    desde la primera solicitud del lote.
+    """
+
+    def __init__(self, loaded_clf, loaded_regr, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, window=10000):
+        self.loaded_clf = loaded_clf
+        self.loaded_regr = loaded_regr
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.batches = 0
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, records):
+        """Encola ``records`` (dict o lista de dicts); devuelve un ``Future``.
+
+        La validación se hace aquí, en el hilo del cliente, para que una
+        solicitud mal formada no tumbe el lote completo.
+        """
+        if isinstance(records, dict):
+            records = [records]
+        X = models.build_features(pd.DataFrame(records))
+        future = Future()
+        self._queue.put((X, future, time.perf_counter()))
+        return future
+
+    def predict(self, records, timeout=None):
+        return self.submit(records).result(timeout)
+
+    def _collect(self):
+        pending = [self._queue.get()]
+        rows = len(pending[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            rows += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            X = pd.concat([item[0] for item in pending], ignore_index=True)
+            try:
+                result = models.score(self.loaded_clf, self.loaded_regr, X)
+            except Exception as e:  # el error se entrega a cada solicitud del lote
+                for _, future, _ in pending:
+                    future.set_exception(e)
+                continue
+
+            records = result.to_dict(orient='records')
+            done = time.perf_counter()
+            start = 0
+            with self._lock:
+                self.requests += len(pending)
+                self.batches += 1
+                self._batch_sizes.append(len(X))
+                for item_X, future, submitted in pending:
+                    self._latencies.append(done - submitted)
+                    future.set_result(records[start:start + len(item_X)])
+                    start += len(item_X)
+
+    def metrics(self):
+        """Latencia p50/p99 (ms) y tamaño de lote sobre la ventana reciente."""
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            sizes = np.array(self._batch_sizes)
+            metrics = {'requests': self.requests, 'batches': self.batches}
+        if len(latencies):
+            metrics.update(
+                latency_p50_ms=round(float(np.percentile(latencies, 50)), 3),
+                latency_p99_ms=round(float(np.percentile(latencies, 99)), 3),
+            )
+        if len(sizes):
+            metrics.update(
+                batch_size_mean=round(float(sizes.mean()), 2),
+                batch_size_p50=float(np.percentile(sizes, 50)),
+                batch_size_max=int(sizes.max()),
+            )
+        return metrics
+
+
+def _to_json(value):
+    return json.dumps(value, ensure_ascii=False, default=lambda o: o.item() if hasattr(o, 'item') else str(o))
+
+
+class PredictionServer(ThreadingHTTPServer):
+    # Backlog amplio: el objetivo es justamente recibir muchas solicitudes a la vez
+    request_queue_size = 128
+
+
+def make_handler(batcher):
+    class PredictionHandler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = _to_json(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self._send(200, batcher.metrics())
+            elif self.path == '/health':
+                self._send(200, {'status': 'ok'})
+            else:
+                self._send(404, {'error': 'ruta no encontrada'})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send(404, {'error': 'ruta no encontrada'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'null')
+                result = batcher.predict(payload)
+            except (ValueError, TypeError) as e:
+                self._send(400, {'error': str(e)})
+                return
+            self._send(200, result[0] if isinstance(payload, dict) else result)
+
+        def log_message(self, format, *args):
+            pass
+
+    return PredictionHandler
+
+
+def serve_stdin(batcher, stdin=sys.stdin, stdout=sys.stdout):
+    """Una solicitud JSON por línea; las respuestas salen en el mismo orden."""
+    pending = deque()
+
+    def flush(block):
+        while pending and (block or pending[0][0].done()):
+            future, single = pending.popleft()
+            try:
+                result = future.result()
+                stdout.write(_to_json(result[0] if single else result) + '\n')
+            except (ValueError, TypeError) as e:
+                stdout.write(_to_json({'error': str(e)}) + '\n')
+        stdout.flush()
+
+    for line in stdin:
+        if not line.strip():
+            continue
+        future = Future()
+        single = True
+        try:
+            payload = json.loads(line)
+            single = isinstance(payload, dict)
+            future = batcher.submit(payload)
+        except (ValueError, TypeError) as e:
+            future.set_exception(e)
+        pending.append((future, single))
+        flush(block=False)
+    flush(block=True)
+    sys.stderr.write(_to_json(batcher.metrics()) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--artifacts', default=str(models.ARTIFACTS_DIR))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS)
+    parser.add_argument('--stdin', action='store_true', help='leer JSON-lines de stdin en lugar de servir HTTP')
+    args = parser.parse_args(argv)
+
+    loaded_clf, loaded_regr = models.load_pipelines(args.artifacts)
+    batcher = MicroBatcher(loaded_clf, loaded_regr, args.max_batch, args.max_wait_ms)
+
+    if args.stdin:
+        serve_stdin(batcher)
+        return
+
+    server = PredictionServer((args.host, args.port), make_handler(batcher))
+    print(f"Sirviendo predicciones en http://{args.host}:{args.port}/predict", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
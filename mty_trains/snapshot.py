@@ -0,0 +1,174 @@
+"""Snapshot columnar (Arrow IPC) del dataset limpio.
+
+El CSV ``;``-delimitado se parsea una sola vez: las fechas quedan ya convertidas,
+las columnas categóricas se guardan como diccionarios de Arrow y el archivo
+lleva en sus metadatos el checksum del CSV del que proviene. Al cargar, el
+snapshot se abre con memory-map y sólo se leen las columnas pedidas; el CSV se
+vuelve a leer únicamente cuando el checksum ya no coincide.
+
+Uso desde la raíz del repo::
+
+    python -m mty_trains.snapshot [ruta_csv]
+"""
+import hashlib
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+from mty_trains import memory, timeseries
+
+CSV_PATH = Path("./data/02_data_for_ML.csv")
+
+CATEGORICAL_COLS = ['day_name', 'Veh', 'Linea', 'Sistema', 'Causó_desalojo', 'Supervisor_reviso', 'Cat', 'Fiabilidad_Servicio']
+
+# Columnas calculadas al construir el dataset (no vienen en el CSV)
+DERIVED_COLS = list(timeseries.PERIOD_KEYS)
+
+_CHECKSUM_KEY = b"mty_trains.csv_sha256"
+
+# Se incrementa cuando cambian las columnas o tipos del snapshot
+_FORMAT_KEY = b"mty_trains.formato"
+_FORMAT = b"3"
+
+
+def checksum(path):
+    """SHA-256 del archivo fuente, leído por bloques."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def snapshot_path(csv_path=CSV_PATH):
+    """El snapshot vive junto al CSV, con extensión ``.arrow``."""
+    return Path(csv_path).with_suffix(".arrow")
+
+
+def _format(compact):
+    return _FORMAT + (b"-compacto" if compact else b"")
+
+
+def read_csv(csv_path=CSV_PATH, compact=memory.COMPACT):
+    """Lectura "en frío" del CSV con el ajuste de tipos del tablero.
+
+    Con ``compact`` se reducen además los tipos (ver ``mty_trains.memory``).
+    """
+    df = pd.read_csv(csv_path, sep=';', encoding='utf-8')
+
+    # Se ajustan los tipos de datos:
+    df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
+    for col in CATEGORICAL_COLS:
+        df[col] = df[col].astype('category')
+
+    df = add_derived(df)
+    return memory.compact(df) if compact else df
+
+
+def add_derived(df):
+    """Agrega las columnas ``DERIVED_COLS`` (llaves de periodo de las series de tiempo)."""
+    return timeseries.add_period_keys(df)
+
+
+def write_snapshot(df, digest, path, compact=memory.COMPACT):
+    """Escribe ``df`` como Arrow IPC sin compresión (apto para memory-map)."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_CHECKSUM_KEY] = digest.encode()
+    metadata[_FORMAT_KEY] = _format(compact)
+    table = table.replace_schema_metadata(metadata)
+
+    # Se escribe a un temporal y se renombra para no dejar snapshots a medias
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    tmp.replace(path)
+    return path
+
+
+def build_snapshot(csv_path=CSV_PATH, path=None, compact=memory.COMPACT):
+    """Paso de build: parsea el CSV y genera el snapshot junto a él."""
+    path = path or snapshot_path(csv_path)
+    return write_snapshot(read_csv(csv_path, compact), checksum(csv_path), path, compact)
+
+
+def snapshot_checksum(path, compact=memory.COMPACT):
+    """Checksum guardado en el snapshot (sólo lee el esquema), o None.
+
+    Un snapshot de un formato anterior (o de otro modo de memoria) cuenta
+    como viejo.
+    """
+    try:
+        with pa.memory_map(str(path), "r") as source:
+            metadata = ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    if metadata.get(_FORMAT_KEY) != _format(compact):
+        return None
+    value = metadata.get(_CHECKSUM_KEY)
+    return value.decode() if value else None
+
+
+def _text_categorical(column):
+    """Categórica con diccionario de strings de Arrow a partir de una columna diccionario."""
+    array = column.unify_dictionaries().combine_chunks() if column.num_chunks > 1 else column.chunk(0)
+    codes = pc.fill_null(array.indices, -1).to_numpy()
+    categories = pd.Index(pd.arrays.ArrowStringArray(array.dictionary.cast(pa.large_string())))
+    return pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories))
+
+
+def read_snapshot(path, columns=None):
+    """Abre el snapshot con memory-map y convierte sólo ``columns`` a pandas.
+
+    Con ``split_blocks`` cada columna numérica queda como vista (de sólo
+    lectura) sobre el archivo mapeado, sin copiarla a un bloque 2D: los
+    workers comparten esas páginas del caché del sistema. ``to_pandas``
+    devolvería los diccionarios de los textos libres como categorías de
+    objetos ``str``; se convierten aparte para que sigan siendo strings de
+    Arrow, como en ``memory.compact``.
+    """
+    with pa.memory_map(str(path), "r") as source:
+        table = ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(list(columns))
+        texts = [
+            col for col in memory.TEXT_COLS
+            if col in table.column_names and pa.types.is_dictionary(table.schema.field(col).type)
+        ]
+        df = table.drop_columns(texts).to_pandas(split_blocks=True)
+        for col in sorted(texts, key=table.column_names.index):
+            df.insert(table.column_names.index(col), col, _text_categorical(table.column(col)))
+        return df
+
+
+def load_dataset(csv_path=CSV_PATH, columns=None, compact=memory.COMPACT):
+    """Carga el dataset desde el snapshot; si está viejo, desde el CSV.
+
+    Cuando el checksum no coincide (o no hay snapshot) se lee el CSV y se
+    regenera el snapshot para el siguiente arranque.
+    """
+    path = snapshot_path(csv_path)
+    digest = checksum(csv_path)
+    if snapshot_checksum(path, compact) == digest:
+        return read_snapshot(path, columns)
+
+    df = read_csv(csv_path, compact)
+    try:
+        write_snapshot(df, digest, path, compact)
+    except OSError:
+        # Directorio de sólo lectura: se sigue sin snapshot
+        pass
+
+    return df if columns is None else df[list(columns)]
+
+
+if __name__ == "__main__":
+    csv_path = Path(sys.argv[1]) if len(sys.argv) > 1 else CSV_PATH
+    out = build_snapshot(csv_path)
+    print(f"Snapshot escrito en {out} (sha256 {snapshot_checksum(out)})")
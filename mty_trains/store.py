@@ -0,0 +1,87 @@
+"""Dataset en memoria compartido por el proceso, con agregados incrementales.
+
+``FailureStore`` guarda las filas, los cubos de agregados, el índice de bitmaps,
+el índice de texto y el orden por vehículo/sistema/fecha de confiabilidad
+como un estado inmutable con número de versión. Agregar un delta construye
+el siguiente estado tocando sólo las filas nuevas: los cubos suman las celdas
+del delta, el índice extiende sus bitmaps, el de texto sólo tokeniza los
+textos nuevos y el de confiabilidad inserta las filas nuevas en su orden.
+Sobre el histórico nada se vuelve a agrupar ni a ordenar: sólo se copian
+los arreglos del estado anterior.
+"""
+import threading
+from typing import NamedTuple
+
+import pandas as pd
+
+from mty_trains import bitmap, cube, reliability, search, snapshot
+
+
+class DatasetState(NamedTuple):
+    df: pd.DataFrame
+    cubes: cube.CubeSet
+    index: bitmap.BitmapIndex
+    text: search.TextIndex
+    reliability: reliability.ReliabilityIndex
+    version: int
+
+
+def _align_categories(frame, categories):
+    """Pone a las columnas categóricas de ``frame`` las categorías de ``categories``."""
+    frame = frame.copy(deep=False)
+    for col, cats in categories.items():
+        if col in frame.columns:
+            frame[col] = frame[col].cat.set_categories(cats)
+    return frame
+
+
+class FailureStore:
+    """Estado versionado del dataset; ``state`` siempre es consistente."""
+
+    def __init__(self, df):
+        self._lock = threading.RLock()
+        self.applied = []
+        self.state = DatasetState(
+            df, cube.CubeSet(df), bitmap.BitmapIndex(df), search.TextIndex(df, search.load_vocabulary()),
+            reliability.ReliabilityIndex(df), 0
+        )
+
+    def append(self, delta, name=None):
+        """Agrega las filas de ``delta`` (ya tipado) y devuelve el nuevo estado."""
+        with self._lock:
+            state = self.state
+            df = state.df
+
+            # Categorías unidas: las existentes conservan su código, las nuevas van al final
+            categories = {}
+            for col in df.columns:
+                if isinstance(df[col].dtype, pd.CategoricalDtype):
+                    old = df[col].cat.categories
+                    categories[col] = old.append(delta[col].cat.categories.difference(old))
+            df = _align_categories(df, categories)
+            delta = _align_categories(delta[df.columns], categories)
+
+            new_df = pd.concat([df, delta], ignore_index=True)
+            new_cubes = state.cubes.extended(new_df, delta)
+            new_index = state.index.extended(delta)
+            new_text = state.text.extended(delta)
+            new_reliability = state.reliability.extended(new_df, delta)
+
+            self.state = DatasetState(new_df, new_cubes, new_index, new_text, new_reliability, state.version + 1)
+            if name is not None:
+                self.applied.append(name)
+            return self.state
+
+    def sync(self, deltas_dir):
+        """Aplica, en orden, los deltas guardados en ``deltas_dir`` que falten."""
+        nuevos = []
+        if not deltas_dir.is_dir():
+            return nuevos
+        with self._lock:
+            for path in sorted(deltas_dir.glob("*.arrow")):
+                if path.name in self.applied:
+                    continue
+                delta = snapshot.read_snapshot(path)
+                self.append(delta, name=path.name)
+                nuevos.append((path.name, len(delta)))
+        return nuevos
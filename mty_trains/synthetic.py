@@ -0,0 +1,58 @@
+"""Generador de bitácoras de fallas sintéticas a escala de flota.
+
+Se remuestrean filas completas del dataset real (así se conservan las
+cardinalidades de ``Linea``, ``Sistema``, ``Cat`` y ``Veh`` y la distribución
+conjunta de sistema, retraso y desalojo) y se les asigna una fecha uniforme
+dentro del rango real; las columnas de calendario se recalculan a partir de
+esa fecha.
+
+Uso desde la raíz del repo::
+
+    python -m mty_trains.synthetic --rows 1000000 --out data/sintetico_1M.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from mty_trains import snapshot
+
+
+def generate(source, n_rows, seed=0):
+    """DataFrame tipado de ``n_rows`` fallas con la forma de ``source``."""
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(source), n_rows)
+    columns = [col for col in source.columns if col not in snapshot.DERIVED_COLS]
+    # .array conserva el tipo de cada columna (categorías incluidas)
+    df = pd.DataFrame({col: source[col].array.take(rows) for col in columns})
+
+    inicio, fin = source['Fecha'].min(), source['Fecha'].max()
+    dias = rng.integers(0, (fin - inicio).days + 1, n_rows)
+    df['Fecha'] = inicio + pd.to_timedelta(dias, unit='D')
+    df['year'] = df['Fecha'].dt.year.astype(source['year'].dtype)
+    df['month'] = df['Fecha'].dt.month.astype(source['month'].dtype)
+    df['day'] = df['Fecha'].dt.day.astype(source['day'].dtype)
+    df['day_name'] = pd.Categorical(df['Fecha'].dt.day_name(), categories=source['day_name'].cat.categories)
+    return snapshot.add_derived(df.sort_values('Fecha', kind='stable').reset_index(drop=True))
+
+
+def write_csv(df, path):
+    """Escribe ``df`` con el formato de ``02_data_for_ML.csv``."""
+    columns = [col for col in df.columns if col not in snapshot.DERIVED_COLS]
+    df[columns].to_csv(path, sep=';', index=False, encoding='utf-8', date_format='%Y-%m-%d')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    df = generate(snapshot.load_dataset(), args.rows, args.seed)
+    write_csv(df, args.out)
+    print(f"{len(df):,} filas escritas en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
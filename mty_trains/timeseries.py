@@ -0,0 +1,61 @@
+"""Series de tiempo de fallas (semanal/mensual) y su curva de estacionalidad.
+
+Las llaves de periodo (lunes de la semana ISO y primer día del mes) se
+calculan una vez sobre el dataset. A partir de los conteos por grupo y
+periodo se rellena con ceros cada periodo sin fallas dentro del rango de su
+grupo y la media móvil de 12 periodos se calcula con un solo ``rolling``
+agrupado.
+"""
+import numpy as np
+import pandas as pd
+
+PERIOD_KEYS = {
+    'periodo_semana': 'W-MON',
+    'periodo_mes': 'MS',
+}
+
+SEASONALITY_WINDOW = 12
+
+
+def add_period_keys(df):
+    """Agrega ``periodo_semana`` y ``periodo_mes`` (vectorizado, sin formatear texto)."""
+    fecha = df['Fecha'].dt.normalize()
+    df['periodo_semana'] = fecha - pd.to_timedelta(fecha.dt.weekday, unit='D')
+    df['periodo_mes'] = fecha.to_numpy().astype('datetime64[M]').astype('datetime64[ns]')
+    return df
+
+
+def fill_gaps(counts, group, period, value='conteo'):
+    """Conteos por ``group`` × ``period`` con los periodos faltantes en cero.
+
+    Cada grupo se rellena sólo entre su primer y su último periodo: una
+    línea que empezó a operar después no recibe ceros antes de su inicio.
+    """
+    if counts.empty:
+        return counts[[group, period, value]]
+    periods = pd.date_range(counts[period].min(), counts[period].max(), freq=PERIOD_KEYS[period])
+    bounds = counts.groupby(group, observed=True)[period].agg(['min', 'max'])
+    start = periods.searchsorted(bounds['min'])
+    lengths = periods.searchsorted(bounds['max'], side='right') - start
+    # Posiciones start..stop de cada grupo, concatenadas
+    positions = np.repeat(start - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    full = pd.MultiIndex.from_arrays([bounds.index.repeat(lengths), periods[positions]], names=[group, period])
+    return (
+        counts.set_index([group, period])[value]
+        .reindex(full, fill_value=0)
+        .reset_index()
+        .sort_values([group, period], kind='stable')
+        .reset_index(drop=True)
+    )
+
+
+def trend(counts, group, period, window=SEASONALITY_WINDOW):
+    """Serie rellenada más ``estacionalidad`` (media móvil de ``window`` periodos por grupo)."""
+    series = fill_gaps(counts, group, period)
+    series['estacionalidad'] = (
+        series.groupby(group, observed=True, sort=False)['conteo']
+        .rolling(window=window, min_periods=1)
+        .mean()
+        .to_numpy()
+    )
+    return series
@@ -0,0 +1,182 @@
+"""Entrenamiento reproducible de los pipelines de ``./artifacts/``.
+
+Sobre ``02_data_for_ML.csv`` y con las variables de la pestaña de
+predicciones (``models.FEATURES``) entrena:
+
+- el clasificador de desalojo (``Causó_desalojo``) y
+- el regresor de minutos de retraso (``Retraso_minutos``),
+
+cada uno como ``ColumnTransformer(OneHotEncoder) -> RandomForest``. Los
+hiperparámetros se eligen con búsqueda aleatoria y validación cruzada en
+procesos paralelos (``--n-jobs``, todos los núcleos por defecto). Se guarda el
+pickle de siempre y la exportación compacta (``mty_trains.forest``), y se
+reporta tamaño, tiempo de carga y latencia de inferencia de ambos formatos.
+
+Uso desde la raíz del repo::
+
+    python -m mty_trains.train --iter 20 --cv 5
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import make_column_transformer
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.model_selection import KFold, RandomizedSearchCV, StratifiedKFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from mty_trains import forest, models, snapshot
+
+CATEGORICAL_FEATURES = ['Linea', 'Sistema', 'Veh']
+REPORT_FILE = "entrenamiento.json"
+
+# Espacio de búsqueda común a ambos bosques (prefijo del paso del pipeline)
+PARAM_SPACE = {
+    'n_estimators': [100, 200, 300],
+    'max_depth': [None, 10, 16, 24],
+    'min_samples_leaf': [1, 2, 5, 10],
+    'max_features': ['sqrt', 0.3, 0.6],
+}
+
+TARGETS = {
+    # archivo: (columna objetivo, estimador, validación cruzada, métrica)
+    models.CLASSIFIER_FILE: ('Causó_desalojo', RandomForestClassifier, StratifiedKFold, 'roc_auc'),
+    models.REGRESSOR_FILE: ('Retraso_minutos', RandomForestRegressor, KFold, 'neg_mean_absolute_error'),
+}
+
+
+def training_data(csv_path=snapshot.CSV_PATH):
+    """(X, objetivos) del dataset limpio."""
+    df = snapshot.load_dataset(csv_path)
+    X = models.build_features(df)
+    return X, {
+        'Causó_desalojo': df['Causó_desalojo'].astype(int).to_numpy(),
+        'Retraso_minutos': df['Retraso_minutos'].astype('float64').to_numpy(),
+    }
+
+
+def make_model(estimator_cls, seed):
+    return make_pipeline(
+        make_column_transformer(
+            (OneHotEncoder(handle_unknown='ignore'), CATEGORICAL_FEATURES),
+            remainder='passthrough',
+        ),
+        estimator_cls(random_state=seed),
+    )
+
+
+def search(X, y, estimator_cls, cv_cls, scoring, n_iter, cv, n_jobs, seed):
+    """Búsqueda aleatoria con CV; cada ajuste corre en un proceso (joblib/loky)."""
+    pipeline = make_model(estimator_cls, seed)
+    step = pipeline.steps[-1][0]
+    searcher = RandomizedSearchCV(
+        pipeline,
+        {f"{step}__{name}": values for name, values in PARAM_SPACE.items()},
+        n_iter=n_iter,
+        scoring=scoring,
+        cv=cv_cls(n_splits=cv, shuffle=True, random_state=seed),
+        n_jobs=n_jobs,
+        random_state=seed,
+        refit=True,
+    )
+    searcher.fit(X, y)
+    return searcher
+
+
+def _timed(func, repeat):
+    tiempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        func()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def _is_classifier(model):
+    return getattr(model, 'classes_', None) is not None
+
+
+def measure(pickle_path, X, repeat=20):
+    """Tamaño, carga y latencia (fila única y lote) del pickle y de la exportación compacta."""
+    compact = forest.compact_path(pickle_path)
+    cargar = {
+        'pickle': lambda: joblib.load(pickle_path),
+        'compacto': lambda: forest.CompactForest(compact),
+    }
+    tamanos = {'pickle': Path(pickle_path).stat().st_size, 'compacto': forest.size_bytes(compact)}
+    # La fila única como la arman el formulario y el servicio (dict de enteros de Python)
+    fila = models.build_features(pd.DataFrame(X.iloc[:1].to_dict('records')))
+    lote = X.iloc[:models.CHUNK_SIZE]
+    resultado = {}
+    for formato, load in cargar.items():
+        modelo = load()
+        predict = modelo.predict_proba if _is_classifier(modelo) else modelo.predict
+        resultado[formato] = {
+            'MB': round(tamanos[formato] / 2**20, 2),
+            'carga_ms': round(_timed(load, 3), 1),
+            'fila_ms': round(_timed(lambda: predict(fila), repeat), 2),
+            f'lote_{len(lote)}_ms': round(_timed(lambda: predict(lote), 3), 1),
+        }
+    referencia, compacto = joblib.load(pickle_path), forest.CompactForest(compact)
+    salida = 'predict_proba' if _is_classifier(referencia) else 'predict'
+    diferencia = np.abs(getattr(referencia, salida)(lote) - getattr(compacto, salida)(lote)).max()
+    resultado['max_diferencia'] = float(diferencia)
+    return resultado
+
+
+def train(csv_path=snapshot.CSV_PATH, artifacts_dir=models.ARTIFACTS_DIR, n_iter=20, cv=5, n_jobs=-1, seed=0, log=print):
+    """Entrena, guarda y mide ambos modelos; devuelve el reporte (también en ``entrenamiento.json``)."""
+    artifacts_dir = Path(artifacts_dir)
+    artifacts_dir.mkdir(parents=True, exist_ok=True)
+    X, objetivos = training_data(csv_path)
+    reporte = {'filas': len(X), 'features': models.FEATURES, 'cv': cv, 'iteraciones': n_iter, 'semilla': seed, 'modelos': {}}
+
+    for archivo, (objetivo, estimator_cls, cv_cls, scoring) in TARGETS.items():
+        inicio = time.perf_counter()
+        searcher = search(X, objetivos[objetivo], estimator_cls, cv_cls, scoring, n_iter, cv, n_jobs, seed)
+        segundos = time.perf_counter() - inicio
+        log(f"{archivo}: {scoring} = {searcher.best_score_:.4f} en {segundos:.1f} s; {searcher.best_params_}")
+
+        pickle_path = artifacts_dir / archivo
+        joblib.dump(searcher.best_estimator_, pickle_path)
+        forest.export(searcher.best_estimator_, forest.compact_path(pickle_path), models.FEATURES, snapshot.checksum(pickle_path))
+
+        medicion = measure(pickle_path, X)
+        for formato in ('pickle', 'compacto'):
+            log(f"  {formato:<9} " + "  ".join(f"{k} {v}" for k, v in medicion[formato].items()))
+        log(f"  diferencia máxima compacto vs pickle: {medicion['max_diferencia']:.2e}")
+        reporte['modelos'][archivo] = {
+            'objetivo': objetivo,
+            'metrica': scoring,
+            'cv_score': searcher.best_score_,
+            'parametros': {k.split('__', 1)[1]: v for k, v in searcher.best_params_.items()},
+            'segundos_busqueda': round(segundos, 1),
+            **medicion,
+        }
+
+    (artifacts_dir / REPORT_FILE).write_text(json.dumps(reporte, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    return reporte
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entrena los pipelines de predicción de ./artifacts/.")
+    parser.add_argument('--csv', type=Path, default=snapshot.CSV_PATH)
+    parser.add_argument('--artifacts', type=Path, default=models.ARTIFACTS_DIR)
+    parser.add_argument('--iter', type=int, default=20, help='combinaciones de hiperparámetros a probar')
+    parser.add_argument('--cv', type=int, default=5, help='particiones de validación cruzada')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='procesos en paralelo (-1 = todos los núcleos)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    train(args.csv, args.artifacts, args.iter, args.cv, args.n_jobs, args.seed)
+    print(f"Reporte escrito en {args.artifacts / REPORT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
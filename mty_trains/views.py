@@ -0,0 +1,29 @@
+"""Registro de vistas del tablero.
+
+Cada sección del tablero se registra como una función; sólo se ejecuta la
+vista activa, en lugar de correr el cuerpo de todas las pestañas en cada
+rerun como hace ``st.tabs``.
+"""
+
+
+class ViewRegistry:
+    """Vistas registradas en orden, indexadas por su título."""
+
+    def __init__(self):
+        self._views = {}
+
+    def register(self, title):
+        """Decorador: registra la función como la vista ``title``."""
+        def decorator(func):
+            self._views[title] = func
+            return func
+        return decorator
+
+    @property
+    def titles(self):
+        return list(self._views)
+
+    def render(self, title):
+        """Ejecuta la vista ``title`` (o la primera si no existe)."""
+        view = self._views.get(title) or next(iter(self._views.values()))
+        return view()
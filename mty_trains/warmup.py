@@ -0,0 +1,190 @@
+"""Precalentamiento de cachés al arrancar el servidor.
+
+En un hilo de fondo carga el almacén del dataset, calcula los agregados de
+todas las vistas con los filtros por defecto y con cada ``Linea`` sola, y
+carga los pipelines de ``./artifacts/``. Todo pasa por ``mty_trains.resources``,
+así que llena las mismas cachés que lee el tablero; mientras tanto el
+servidor ya acepta conexiones (una sesión que llega antes sólo espera lo que
+aún se está calculando).
+
+``progress`` expone el avance y los tiempos de primer pintado de cada sesión,
+marcados como fríos (antes de terminar el precalentamiento) o calientes.
+
+Uso desde la raíz del repo (el resto de argumentos van a ``streamlit run``)::
+
+    python -m mty_trains.warmup --server.port 8501
+"""
+import logging
+import statistics
+import sys
+import threading
+import time
+
+from mty_trains import resources, resultcache
+
+# Agregados que leen las vistas de app.py: (agrupación, sólo desalojos)
+AGREGADOS = [
+    (('Linea', 'Cat'), False),
+    (('Linea', 'Sistema'), False),
+    (('Veh', 'Cat'), False),
+    (('Sistema', 'Linea'), False),
+    (('Linea', 'Veh'), False),
+    (('Sistema', 'Causó_desalojo'), False),
+    (('Linea', 'Sistema'), True),
+    (('Linea', 'Cat'), True),
+    (('Linea', 'Veh'), True),
+]
+PERIODOS = ['periodo_semana', 'periodo_mes']
+
+# Con nombre fijo: con ``python -m`` este archivo corre además como ``__main__``
+logger = logging.getLogger("mty_trains.warmup")
+if not logger.handlers:
+    # Streamlit sólo configura sus propios loggers: el avance va al log del servidor
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class Progress:
+    """Avance del precalentamiento y primeros pintados; seguro entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = None
+        self.finished = None
+        self.total = 0
+        self.done = 0
+        self.current = None
+        self.errors = []
+        self.first_paints = []
+
+    @property
+    def running(self):
+        return self.started is not None and self.finished is None
+
+    @property
+    def complete(self):
+        return self.finished is not None
+
+    def record_first_paint(self, ms, warm):
+        with self._lock:
+            self.first_paints.append((ms, warm))
+        if self.started is not None:
+            logger.info("[precalentamiento] primer pintado: %s ms (%s)", f"{ms:,.0f}", 'caliente' if warm else 'frío')
+
+    def summary(self):
+        """Mediana y número de primeros pintados fríos y calientes."""
+        with self._lock:
+            paints = list(self.first_paints)
+        resumen = {}
+        for nombre, warm in (('frío', False), ('caliente', True)):
+            tiempos = [ms for ms, w in paints if w == warm]
+            resumen[nombre] = {
+                'sesiones': len(tiempos),
+                'mediana_ms': round(statistics.median(tiempos), 1) if tiempos else None,
+            }
+        return resumen
+
+
+progress = Progress()
+_start_lock = threading.Lock()
+
+_THREAD_NAME = "precalentamiento"
+
+
+class _OutsideSessionFilter(logging.Filter):
+    """Las funciones cacheadas avisan en cada llamada que corren fuera de una sesión."""
+
+    def filter(self, record):
+        return record.threadName != _THREAD_NAME
+
+
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(_OutsideSessionFilter())
+
+
+def default_filters(df):
+    """Filtros con los que abre el tablero: todo seleccionado, todos los años, sin búsqueda."""
+    return resultcache.canonical_filters(
+        df['Linea'].cat.categories, df['Sistema'].cat.categories,
+        df['Cat'].cat.categories, df['Veh'].cat.categories,
+        (df['year'].min(), df['year'].max()),
+    )
+
+
+def view_tasks(df):
+    """Pasos de la vista por defecto y de cada línea sola: (nombre, función)."""
+    def vista(filtros):
+        def calcular():
+            estado = resources.load_data().state
+            resources.seleccionar(estado, estado.version, filtros)
+            for by, solo_desalojos in AGREGADOS:
+                resources.agregado(estado, filtros, by, solo_desalojos)
+            for periodo in PERIODOS:
+                resources.tendencia(estado, filtros, periodo)
+        return calcular
+
+    base = default_filters(df)
+    pasos = [("vista por defecto", vista(base))]
+    for linea in base[0]:
+        pasos.append((f"Línea {linea}", vista(((linea,),) + base[1:])))
+    return pasos
+
+
+def _run_step(nombre, paso, log):
+    progress.current = nombre
+    inicio = time.perf_counter()
+    try:
+        paso()
+    except Exception as e:
+        progress.errors.append((nombre, repr(e)))
+        log(f"[precalentamiento] {nombre}: error {e!r}")
+        ok = False
+    else:
+        log(f"[precalentamiento] {nombre}: {(time.perf_counter() - inicio) * 1000:,.0f} ms")
+        ok = True
+    progress.done += 1
+    return ok
+
+
+def run(log=logger.info):
+    """Corre el precalentamiento completo (bloquea); los errores no lo detienen."""
+    progress.started = time.perf_counter()
+    progress.total = 2
+    # Sin dataset no hay vistas que precalentar; los modelos se cargan de todos modos
+    cargado = _run_step("dataset", resources.load_data, log)
+    pasos = view_tasks(resources.load_data().state.df) if cargado else []
+    progress.total += len(pasos)
+    for nombre, paso in [("modelos", resources.load_models), *pasos]:
+        _run_step(nombre, paso, log)
+    progress.current = None
+    progress.finished = time.perf_counter()
+    log(f"[precalentamiento] listo en {progress.finished - progress.started:.1f} s ({progress.total} pasos)")
+    return progress
+
+
+def start():
+    """Lanza ``run`` en un hilo de fondo (una sola vez por proceso)."""
+    with _start_lock:
+        if progress.started is None:
+            progress.started = time.perf_counter()
+            hilo = threading.Thread(target=run, name=_THREAD_NAME, daemon=True)
+            hilo.start()
+    return progress
+
+
+def main(argv=None):
+    from streamlit.web import cli
+
+    # Con ``python -m`` este módulo es ``__main__``; app.py importa ``mty_trains.warmup``,
+    # así que el hilo y ``progress`` deben ser los de ese módulo
+    from mty_trains import warmup
+
+    warmup.start()
+    sys.argv = ["streamlit", "run", "app.py", *(sys.argv[1:] if argv is None else argv)]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""Regeneración de los datasets limpios desde el libro de Excel original.
+
+``data/Listado de averias material rodante 2010-2025.xlsx`` se lee en
+streaming, hoja por hoja y fila por fila, directamente del XML del ``.xlsx``
+(sin cargar el libro completo ni depender de un lector de Excel). Las filas
+se agrupan en bloques que se limpian en procesos paralelos; los bloques se
+escriben en el orden del libro en cuanto están listos, así que la salida es
+la misma con cualquier número de procesos y la memoria queda acotada por los
+bloques en vuelo.
+
+Se escriben los dos archivos que lee el proyecto:
+
+- ``00_clean_data.csv``: todas las filas válidas, ``Porcentaje_desalojo`` como
+  fracción (0.5).
+- ``02_data_for_ML.csv``: años del libro (``FIRST_YEAR`` en adelante) sin el
+  retraso atípico, ``Porcentaje_desalojo`` en porcentaje (50.0).
+
+Uso desde la raíz del repo::
+
+    python -m mty_trains.workbook [--workers N] [--snapshot]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import unicodedata
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path, PurePosixPath
+from xml.etree.ElementTree import iterparse
+
+import numpy as np
+import pandas as pd
+
+from mty_trains import snapshot
+
+WORKBOOK_PATH = Path("./data/Listado de averias material rodante 2010-2025.xlsx")
+CLEAN_PATH = Path("./data/00_clean_data.csv")
+ML_PATH = snapshot.CSV_PATH
+
+CHUNK_ROWS = 2000
+
+# Filtros de 02_data_for_ML.csv: fechas fuera del rango del libro y retrasos atípicos
+FIRST_YEAR = 2010
+MAX_RETRASO = 100
+
+# Columnas del libro -> columnas del dataset limpio
+RENAMES = {
+    'Retraso minutos': 'Retraso_minutos',
+    'Causó desalojo': 'Causó_desalojo',
+    'Porcentaje desalojo': 'Porcentaje_desalojo',
+    'Supervisor reviso': 'Supervisor_reviso',
+    'Fiabilidad Servicio': 'Fiabilidad_Servicio',
+}
+COLUMNS = [
+    'Fecha', 'year', 'month', 'day', 'day_name', 'Veh', 'Linea', 'Descripcion', 'Correccion',
+    'Sistema', 'Retraso_minutos', 'Causó_desalojo', 'Porcentaje_desalojo', 'Supervisor_reviso',
+    'Cat', 'Fiabilidad_Servicio',
+]
+TEXT_COLS = ['Descripcion', 'Correccion', 'Sistema']
+# Sin estos datos (ni fecha válida) el registro no sirve; tampoco un desalojo sin porcentaje
+REQUIRED = ['Veh', 'Sistema', 'Correccion', 'Supervisor_reviso', 'Cat', 'Fiabilidad_Servicio']
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_COLUMN = re.compile(r"[A-Z]+")
+_PUNCTUATION = re.compile(r"[^0-9a-z\s]")
+
+
+def _column_index(ref):
+    index = 0
+    for letter in _COLUMN.match(ref).group():
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def _text(element):
+    return ''.join(t.text or '' for t in element.iter(f"{_NS}t"))
+
+
+def sheets(path=WORKBOOK_PATH):
+    """Hojas del libro en orden: lista de (nombre, ruta del XML dentro del zip)."""
+    with zipfile.ZipFile(path) as z:
+        targets = {}
+        for _, rel in iterparse(z.open("xl/_rels/workbook.xml.rels")):
+            if rel.tag == f"{_PKG_REL_NS}Relationship":
+                target = rel.get('Target')
+                targets[rel.get('Id')] = target.lstrip('/') if target.startswith('/') else f"xl/{target}"
+        return [
+            (sheet.get('name'), str(PurePosixPath(targets[sheet.get(f"{_REL_NS}id")])))
+            for _, sheet in iterparse(z.open("xl/workbook.xml"))
+            if sheet.tag == f"{_NS}sheet"
+        ]
+
+
+def _shared_strings(z):
+    if "xl/sharedStrings.xml" not in z.namelist():
+        return []
+    strings = []
+    for _, element in iterparse(z.open("xl/sharedStrings.xml")):
+        if element.tag == f"{_NS}si":
+            strings.append(_text(element))
+            element.clear()
+    return strings
+
+
+def _value(cell, strings):
+    kind = cell.get('t')
+    if kind == 'inlineStr':
+        return _text(cell)
+    v = cell.find(f"{_NS}v")
+    if v is None or kind == 'e':
+        return None
+    if kind == 's':
+        return strings[int(v.text)]
+    if kind in ('str', 'b'):
+        return v.text
+    return float(v.text)
+
+
+def iter_rows(path=WORKBOOK_PATH):
+    """Filas de todas las hojas como (hoja, lista de valores); sólo una fila en memoria."""
+    with zipfile.ZipFile(path) as z:
+        strings = _shared_strings(z)
+        for name, member in sheets(path):
+            sheet_data = None
+            for event, element in iterparse(z.open(member), events=('start', 'end')):
+                if event == 'start':
+                    if element.tag == f"{_NS}sheetData":
+                        sheet_data = element
+                    continue
+                if element.tag != f"{_NS}row":
+                    continue
+                row = {_column_index(c.get('r')): _value(c, strings) for c in element.iter(f"{_NS}c")}
+                sheet_data.clear()
+                yield name, [row.get(i) for i in range(max(row) + 1)] if row else []
+
+
+def iter_chunks(path=WORKBOOK_PATH, chunk_rows=CHUNK_ROWS):
+    """Bloques de hasta ``chunk_rows`` filas crudas (con el encabezado de su hoja)."""
+    header, current, chunk = None, None, []
+    for name, values in iter_rows(path):
+        if name != current:
+            if chunk:
+                yield pd.DataFrame(chunk, columns=header)
+            # La primera fila de cada hoja es el encabezado
+            header, current, chunk = [str(v).strip() if v is not None else '' for v in values], name, []
+            continue
+        if not any(v is not None for v in values):
+            continue
+        chunk.append((values + [None] * len(header))[:len(header)])
+        if len(chunk) == chunk_rows:
+            yield pd.DataFrame(chunk, columns=header)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame(chunk, columns=header)
+
+
+def normalize_text(text):
+    """Minúsculas, sin acentos ni puntuación: "Se cambió DO, CC." -> "se cambio do cc"."""
+    text = str(text).lower().replace('  ', ' ')
+    decomposed = unicodedata.normalize('NFKD', text)
+    return _PUNCTUATION.sub('', ''.join(ch for ch in decomposed if not unicodedata.combining(ch)))
+
+
+def _excel_dates(values):
+    serial = pd.to_numeric(values, errors='coerce')
+    # Excel cuenta el 29/02/1900 que no existió: antes de esa fecha el serial va un día atrás
+    serial = serial.where(serial >= 60, serial + 1)
+    return pd.to_datetime(serial, unit='D', origin='1899-12-30')
+
+
+def _supervisor(value):
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else str(value)
+    return value
+
+
+def clean_chunk(raw):
+    """Limpia un bloque de filas del libro con las columnas de ``00_clean_data.csv``."""
+    raw = raw.rename(columns=RENAMES)
+    fecha = _excel_dates(raw['Fecha'])
+    desalojo = pd.to_numeric(raw['Causó_desalojo'], errors='coerce')
+    porcentaje = pd.to_numeric(raw['Porcentaje_desalojo'], errors='coerce')
+
+    valid = fecha.notna() & raw[REQUIRED].notna().all(axis=1) & ~((desalojo == 1) & porcentaje.isna())
+    raw, fecha = raw[valid], fecha[valid]
+
+    df = pd.DataFrame({
+        'Fecha': fecha.dt.strftime('%Y-%m-%d'),
+        'year': fecha.dt.year,
+        'month': fecha.dt.month,
+        'day': fecha.dt.day,
+        'day_name': fecha.dt.day_name(),
+        'Veh': pd.to_numeric(raw['Veh']).astype(np.int64),
+        # Los primeros años sólo había línea 1 y el libro deja la celda vacía
+        'Linea': pd.to_numeric(raw['Linea']).fillna(1).astype(np.int64),
+        'Retraso_minutos': pd.to_numeric(raw['Retraso_minutos'], errors='coerce').fillna(0.0),
+        'Causó_desalojo': desalojo[valid].fillna(0).astype(np.int64),
+        'Porcentaje_desalojo': porcentaje[valid].fillna(0.0),
+        'Supervisor_reviso': raw['Supervisor_reviso'].map(_supervisor),
+        'Cat': pd.to_numeric(raw['Cat']).astype(np.int64),
+        'Fiabilidad_Servicio': pd.to_numeric(raw['Fiabilidad_Servicio']).astype(np.int64),
+    })
+    for col in TEXT_COLS:
+        df[col] = raw[col].map(normalize_text)
+    return df[COLUMNS]
+
+
+def for_ml(clean):
+    """Filas y escala de ``02_data_for_ML.csv`` a partir del dataset limpio."""
+    ml = clean[(clean['year'] >= FIRST_YEAR) & (clean['Retraso_minutos'] <= MAX_RETRASO)].copy()
+    ml['Porcentaje_desalojo'] = ml['Porcentaje_desalojo'] * 100
+    return ml
+
+
+def _clean_both(raw):
+    clean = clean_chunk(raw)
+    return clean, for_ml(clean)
+
+
+def _ordered(func, chunks, workers):
+    """``map`` en ``workers`` procesos, en orden y con a lo más ``2 * workers`` bloques en vuelo."""
+    if workers <= 1:
+        yield from map(func, chunks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(func, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def _write(df, path, first):
+    # Mismo formato que los CSV originales: ``;``, fin de línea CRLF, sin índice
+    df.to_csv(path, sep=';', index=False, header=first, mode='w' if first else 'a', lineterminator='\r\n', encoding='utf-8')
+
+
+def build(workbook=WORKBOOK_PATH, clean_path=CLEAN_PATH, ml_path=ML_PATH, workers=None, chunk_rows=CHUNK_ROWS):
+    """Escribe ambos CSV desde el libro; devuelve ``(filas limpias, filas para ML)``."""
+    workers = workers or os.cpu_count() or 1
+    tmp_clean, tmp_ml = Path(f"{clean_path}.tmp"), Path(f"{ml_path}.tmp")
+    n_clean = n_ml = 0
+    for clean, ml in _ordered(_clean_both, iter_chunks(workbook, chunk_rows), workers):
+        _write(clean, tmp_clean, first=n_clean == 0)
+        _write(ml, tmp_ml, first=n_ml == 0)
+        n_clean += len(clean)
+        n_ml += len(ml)
+    if not n_clean:
+        raise ValueError(f"{workbook} no tiene filas válidas.")
+    # Los archivos sólo se reemplazan cuando están completos
+    tmp_clean.replace(clean_path)
+    tmp_ml.replace(ml_path)
+    return n_clean, n_ml
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenera los CSV limpios desde el libro de Excel.")
+    parser.add_argument('--workbook', type=Path, default=WORKBOOK_PATH)
+    parser.add_argument('--clean', type=Path, default=CLEAN_PATH)
+    parser.add_argument('--ml', type=Path, default=ML_PATH)
+    parser.add_argument('--workers', type=int, default=None, help='procesos de limpieza (todos los núcleos por defecto)')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--snapshot', action='store_true', help='también reconstruye el snapshot Arrow del CSV para ML')
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    try:
+        n_clean, n_ml = build(args.workbook, args.clean, args.ml, args.workers, args.chunk_rows)
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+        print(f"{args.workbook}: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"{args.clean}: {n_clean} filas; {args.ml}: {n_ml} filas ({time.perf_counter() - inicio:.1f} s)")
+    if args.snapshot:
+        print(f"Snapshot escrito en {snapshot.build_snapshot(args.ml)}")
+
+
+if __name__ == "__main__":
+    main()
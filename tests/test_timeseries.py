@@ -0,0 +1,35 @@
+import pandas as pd
+
+from mty_trains import timeseries
+
+
+def test_fill_gaps_only_within_each_group_range():
+    counts = pd.DataFrame({
+        'Linea': pd.Categorical([1, 1, 2, 2], categories=[1, 2]),
+        'periodo_mes': pd.to_datetime(['2010-01-01', '2010-04-01', '2016-01-01', '2016-03-01']),
+        'conteo': [3, 1, 2, 5],
+    })
+
+    series = timeseries.fill_gaps(counts, 'Linea', 'periodo_mes')
+
+    linea_1 = series[series['Linea'] == 1]
+    linea_2 = series[series['Linea'] == 2]
+    assert list(linea_1['periodo_mes']) == list(pd.date_range('2010-01-01', '2010-04-01', freq='MS'))
+    assert list(linea_1['conteo']) == [3, 0, 0, 1]
+    # La línea 2 empieza en 2016: sin ceros antes de su primera falla
+    assert list(linea_2['periodo_mes']) == list(pd.date_range('2016-01-01', '2016-03-01', freq='MS'))
+    assert list(linea_2['conteo']) == [2, 0, 5]
+
+
+def test_trend_seasonality_starts_at_each_group_first_period():
+    counts = pd.DataFrame({
+        'Linea': [1, 2],
+        'periodo_semana': pd.to_datetime(['2015-01-05', '2016-01-04']),
+        'conteo': [4, 6],
+    })
+
+    series = timeseries.trend(counts, 'Linea', 'periodo_semana')
+
+    linea_2 = series[series['Linea'] == 2]
+    assert len(linea_2) == 1
+    assert linea_2['estacionalidad'].tolist() == [6.0]